@@ -30,12 +30,16 @@ setup(
         "auth": [
             "flask>=3.0.0"
         ],
+        "cache": [
+            "pyarrow>=7.0.0"
+        ],
         "full": [
             "plotly>=5.0.0",
             "networkx>=2.6.0",
             "scipy>=1.7.0",
             "textblob>=0.15.0",
-            "flask>3.0.0"
+            "flask>3.0.0",
+            "pyarrow>=7.0.0"
         ]
     },
     entry_points={
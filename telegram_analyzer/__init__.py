@@ -9,6 +9,7 @@ __version__ = "1.0.0"
 
 # Import key components to make them available at package level
 from telegram_analyzer.parser import TelegramDataParser
+from telegram_analyzer.batch import BatchIngestor
 from telegram_analyzer.analyzer import ChatAnalyzer
 from telegram_analyzer.visualizer import Visualizer
 from telegram_analyzer.report import ReportGenerator
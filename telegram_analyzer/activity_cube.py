@@ -0,0 +1,207 @@
+"""
+Day x hour x user message count cube with prefix sums for range queries.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Tuple
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Label of the bucket holding senders outside the top users (and messages without a sender)
+OTHER_USERS = '(other)'
+
+# File of the cube in an output directory, answering the dashboard's date range queries
+ACTIVITY_CUBE_FILE = 'activity_cube.npz'
+
+
+class ActivityCube:
+    """
+    Message counts per calendar day, hour of day and sender.
+
+    The counts are stored as cumulative sums over days, so the counts of any
+    day range are the difference of two slices and cost the same whatever the
+    length of the range. Only the ``top_users`` most active senders get their
+    own slot; everyone else is counted in a shared OTHER_USERS slot, which
+    keeps the cube small for large groups while totals stay exact.
+
+    Date bounds of the queries are calendar days: ``start`` is included,
+    ``end`` excluded, and times of day are ignored. Days are the wall-clock
+    dates of the 'date' column.
+    """
+
+    def __init__(self, first_day: np.datetime64, users: List[str], prefix: np.ndarray):
+        """
+        Initialize the cube from its prefix sums; use from_frame() or load() to build one.
+
+        Args:
+            first_day: Date of the first day slot
+            users: Sender of each user slot, the last one being OTHER_USERS
+            prefix: Array of shape (days + 1, 24, users) with the counts of all days before each index
+        """
+        self.logger = logging.getLogger(__name__)
+        self.first_day = np.datetime64(first_day, 'D')
+        self.users = list(users)
+        self._user_slots = {user: slot for slot, user in enumerate(self.users)}
+        self._prefix = prefix
+        # Prefix sums over users as well, for the common all-users queries
+        self._day_hour_prefix = prefix.sum(axis=2, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, top_users: int = 50,
+                   hour: Optional[pd.Series] = None) -> 'ActivityCube':
+        """
+        Build the cube from processed messages.
+
+        Args:
+            df: DataFrame with 'date' and 'from' columns
+            top_users: Number of most active senders given their own slot
+            hour: Hour of day of each message, when already computed
+
+        Returns:
+            ActivityCube of the messages
+        """
+        dates = df['date']
+        if getattr(dates.dtype, 'tz', None) is not None:
+            dates = dates.dt.tz_localize(None)
+        day_values = dates.to_numpy(dtype='datetime64[D]')
+        hours = (dates.dt.hour if hour is None else hour).to_numpy(dtype=np.int64)
+
+        counts = df['from'].value_counts()
+        users = [user for user in counts[counts > 0].index[:top_users]] + [OTHER_USERS]
+        user_codes = pd.Categorical(df['from'], categories=users[:-1]).codes.astype(np.int64)
+        user_codes[user_codes < 0] = len(users) - 1
+
+        if len(day_values):
+            first_day = day_values.min()
+            day_codes = (day_values - first_day).astype(np.int64)
+            n_days = int(day_codes.max()) + 1
+        else:
+            first_day = np.datetime64('1970-01-01', 'D')
+            day_codes = np.zeros(0, dtype=np.int64)
+            n_days = 0
+
+        cells = (day_codes * 24 + hours) * len(users) + user_codes
+        dtype = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+        prefix = np.zeros((n_days + 1, 24, len(users)), dtype=dtype)
+        np.cumsum(
+            np.bincount(cells, minlength=n_days * 24 * len(users)).reshape(n_days, 24, len(users)),
+            axis=0, out=prefix[1:]
+        )
+        return cls(first_day, users, prefix)
+
+    def save(self, path: str):
+        """Write the cube to a .npz file"""
+        np.savez_compressed(path, first_day=np.array(self.first_day), users=np.array(self.users, dtype=str),
+                            prefix=self._prefix)
+
+    @classmethod
+    def load(cls, path: str) -> 'ActivityCube':
+        """Read a cube written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['first_day'][()], data['users'].tolist(), data['prefix'])
+
+    @property
+    def n_days(self) -> int:
+        """Number of day slots, from the first to the last message day"""
+        return self._prefix.shape[0] - 1
+
+    @property
+    def days(self) -> pd.DatetimeIndex:
+        """Date of each day slot"""
+        return pd.date_range(pd.Timestamp(self.first_day), periods=self.n_days, freq='D')
+
+    @property
+    def total(self) -> int:
+        """Number of messages in the cube"""
+        return int(self._day_hour_prefix[-1].sum())
+
+    def _day_range(self, start=None, end=None) -> Tuple[int, int]:
+        """Day slot range [low, high) of calendar day bounds"""
+        def slot(value, default):
+            if value is None:
+                return default
+            offset = (np.datetime64(pd.Timestamp(value).date(), 'D') - self.first_day).astype(np.int64)
+            return int(min(max(offset, 0), self.n_days))
+        low, high = slot(start, 0), slot(end, self.n_days)
+        return low, max(low, high)
+
+    def _user_index(self, users: Optional[Iterable[str]]) -> Optional[List[int]]:
+        """User slots of the selected senders (None for everyone)"""
+        if users is None:
+            return None
+        users = [users] if isinstance(users, str) else list(users)
+        missing = [user for user in users if user not in self._user_slots]
+        if missing:
+            raise KeyError(f"Users without their own slot in the activity cube: {', '.join(map(str, missing))}")
+        return [self._user_slots[user] for user in users]
+
+    def _range_day_hour(self, start, end, users) -> np.ndarray:
+        """Counts per hour over a day range (24 values)"""
+        low, high = self._day_range(start, end)
+        slots = self._user_index(users)
+        if slots is None:
+            return self._day_hour_prefix[high] - self._day_hour_prefix[low]
+        return (self._prefix[high][:, slots].astype(np.int64) - self._prefix[low][:, slots]).sum(axis=1)
+
+    def _per_day_hour(self, start, end, users) -> Tuple[int, np.ndarray]:
+        """First day slot and the (days, 24) counts of a day range"""
+        low, high = self._day_range(start, end)
+        slots = self._user_index(users)
+        if slots is None:
+            prefix = self._day_hour_prefix[low:high + 1]
+        else:
+            prefix = self._prefix[low:high + 1][:, :, slots].sum(axis=2, dtype=np.int64)
+        return low, np.diff(prefix, axis=0)
+
+    def count(self, start=None, end=None, hours: Optional[Iterable[int]] = None,
+              users: Optional[Iterable[str]] = None) -> int:
+        """
+        Number of messages in a day range.
+
+        Args:
+            start: First day included (unbounded when None)
+            end: First day excluded (unbounded when None)
+            hours: Hours of day to count (all when None)
+            users: Senders to count, each of them a slot of the cube (all when None)
+
+        Returns:
+            Message count
+        """
+        hourly = self._range_day_hour(start, end, users)
+        return int(hourly.sum() if hours is None else hourly[list(hours)].sum())
+
+    def hourly(self, start=None, end=None, users: Optional[Iterable[str]] = None) -> pd.Series:
+        """Messages per hour of day (0-23) in a day range"""
+        return pd.Series(self._range_day_hour(start, end, users), index=pd.RangeIndex(24, name='hour'))
+
+    def user_totals(self, start=None, end=None) -> pd.Series:
+        """Messages per user slot in a day range"""
+        low, high = self._day_range(start, end)
+        totals = (self._prefix[high].astype(np.int64) - self._prefix[low]).sum(axis=0)
+        return pd.Series(totals, index=pd.Index(self.users, name='from'))
+
+    def daily(self, start=None, end=None, users: Optional[Iterable[str]] = None) -> pd.Series:
+        """Messages per calendar day in a day range, including days without messages"""
+        low, counts = self._per_day_hour(start, end, users)
+        days = pd.date_range(pd.Timestamp(self.first_day + low), periods=len(counts), freq='D')
+        return pd.Series(counts.sum(axis=1), index=days)
+
+    def weekday_hour(self, start=None, end=None, users: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Messages per weekday (rows, Monday first) and hour of day (columns) in a day range"""
+        low, counts = self._per_day_hour(start, end, users)
+        # 1970-01-01, day 0 of datetime64, was a Thursday
+        weekdays = (np.arange(low, low + len(counts)) + self.first_day.astype(np.int64) + 3) % 7
+        grid = np.zeros((7, 24), dtype=np.int64)
+        np.add.at(grid, weekdays, counts)
+        return pd.DataFrame(grid, index=pd.Index(WEEKDAYS, name='weekday'), columns=pd.RangeIndex(24, name='hour'))
+
+    def weekday_totals(self, start=None, end=None, users: Optional[Iterable[str]] = None) -> pd.Series:
+        """Messages per weekday, Monday first, in a day range"""
+        return self.weekday_hour(start, end, users).sum(axis=1)
+
+    def monthly(self, start=None, end=None, users: Optional[Iterable[str]] = None) -> pd.Series:
+        """Messages per month of the year (1-12) in a day range"""
+        daily = self.daily(start, end, users)
+        return daily.groupby(daily.index.month).sum().reindex(range(1, 13), fill_value=0)
@@ -3,24 +3,73 @@ Analyzes processed chat data.
 """
 
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
 from nltk.corpus import stopwords
+import time
 import logging
 import nltk
 import re
 import numpy as np
-from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
+from .lexicon import LexiconMatcher, ACUTE_TERMS, CHRONIC_TERMS
+from .features import FeatureStore
+from .sketches import SpaceSaving, count_by_key, iter_ngrams
+from .sampling import StratifiedSample
+from .reply_graph import ReplyGraph
+
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Words considered for concept extraction
+CONCEPT_WORD_PATTERN = re.compile(r'\b[a-z]{4,}\b')
+
+# Escalation score of a burst whose sentiment drops by 0.3
+ESCALATION_SCORE = 15.0
+
+# Statistics sections of get_all_stats: name -> (method, sections whose results it takes as arguments)
+STAT_SECTIONS = {
+    'basic_stats': ('get_basic_stats', ()),
+    'user_stats': ('get_user_stats', ()),
+    'activity_patterns': ('get_activity_patterns', ()),
+    'content_analysis': ('get_content_analysis', ()),
+    'chat_velocity': ('get_chat_velocity', ()),
+    'engagement_intelligence': ('get_engagement_intelligence', ()),
+    'burst_table': ('get_burst_table', ()),
+    'conversation_bursts': ('get_conversation_bursts', ()),
+    'executive_summary': ('get_executive_summary', ()),
+    'psychological_stats': ('get_psychological_stats', ()),
+    'social_dynamics': ('get_social_dynamics', ()),
+    'reply_threads': ('get_reply_stats', ()),
+    'semantic_concepts': ('get_semantic_concepts', ()),
+    'user_dna': ('get_user_dna', ()),
+    'stability_index': ('get_stability_index', ('burst_table',)),
+}
+
+# Sections only computed as dependencies of others, never requested or returned
+INTERMEDIATE_SECTIONS = ('burst_table',)
+
+# Sections approximate mode still runs on every message: those built on bounded-memory sketches,
+# on message counts, and on the order of messages or their replies, which a sample does not keep
+EXACT_SECTIONS = ('basic_stats', 'activity_patterns', 'chat_velocity', 'conversation_bursts', 'executive_summary',
+                  'social_dynamics', 'reply_threads', 'semantic_concepts', 'stability_index')
+
 
 class ChatAnalyzer:
     """Analyzes processed chat data"""
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, stop_words: Optional[Iterable[str]] = None,
+                 _features: Optional[FeatureStore] = None):
         """
         Initialize the chat analyzer.
         
         Args:
             df: DataFrame containing processed chat messages
+            stop_words: Words left out of text analyses (NLTK's English stopwords when None)
+            _features: Feature store already built for df, used by views of an analyzer
         """
         self.df = df
         
@@ -28,60 +77,89 @@ class ChatAnalyzer:
         self.logger = logging.getLogger(__name__)
         
         # Try to load stopwords
-        try:
-            nltk.download('stopwords', quiet=True)
-            self.stop_words = set(stopwords.words('english'))
-        except Exception as e:
-            self.logger.warning(f"Could not load NLTK stopwords: {e}")
-            self.stop_words = set()
+        if stop_words is not None:
+            self.stop_words = set(stop_words)
+        else:
+            try:
+                nltk.download('stopwords', quiet=True)
+                self.stop_words = set(stopwords.words('english'))
+            except Exception as e:
+                self.logger.warning(f"Could not load NLTK stopwords: {e}")
+                self.stop_words = set()
         
         # Ensure date column is datetime
         if not pd.api.types.is_datetime64_any_dtype(self.df['date']):
             self.df['date'] = pd.to_datetime(self.df['date'])
+        
+        # Derived columns and aggregates shared by all analysis methods
+        self._features = FeatureStore(self.df) if _features is None else _features
+
+    @property
+    def features(self) -> FeatureStore:
+        """Memoized derived features of the current DataFrame"""
+        self._features.bind(self.df)
+        return self._features
+
+    def get_user_table(self) -> pd.DataFrame:
+        """
+        Aggregate every per-user metric in a single groupby pass.
+        
+        Returns:
+            DataFrame indexed by sender, in order of first appearance, with message
+            and media counts, first/last message dates, text length, sentiment and
+            posting hour statistics
+        """
+        return self.features.user_table
+
+    def get_user_hours(self) -> pd.DataFrame:
+        """
+        Hourly message counts per user.
+        
+        Returns:
+            DataFrame indexed like get_user_table() with one column per hour (0-23)
+        """
+        return self.features.user_hours
 
     def get_basic_stats(self) -> Dict:
         """Calculate basic chat statistics"""
-        # Ensure text length column exists
-        if 'text_length' not in self.df.columns:
-            self.df['text_length'] = self.df['text'].str.len()
+        features = self.features
+        start, end = features.date_bounds
         
         return {
             'total_messages': len(self.df),
-            'total_participants': self.df['from'].nunique(),
+            'total_participants': len(features.user_counts),
             'date_range': {
-                'start': self.df['date'].min(),
-                'end': self.df['date'].max(),
-                'total_days': (self.df['date'].max() - self.df['date'].min()).days
+                'start': start,
+                'end': end,
+                'total_days': (end - start).days
             },
-            'media_messages': self.df['media_type'].notna().sum(),
-            'avg_message_length': self.df['text_length'].mean()
+            'media_messages': int(features.has_media.sum()),
+            'avg_message_length': features.text_length.mean()
         }
 
     def get_user_stats(self) -> Dict:
         """Calculate user-specific statistics"""
         user_stats = {}
         
-        # Ensure text length column exists
-        if 'text_length' not in self.df.columns:
-            self.df['text_length'] = self.df['text'].str.len()
-        
-        for user in self.df['from'].unique():
-            user_messages = self.df[self.df['from'] == user]
+        for user, row in self.get_user_table().iterrows():
             user_stats[user] = {
-                'message_count': len(user_messages),
-                'media_count': user_messages['media_type'].notna().sum(),
-                'avg_message_length': user_messages['text_length'].mean(),
-                'avg_sentiment': user_messages['sentiment'].mean() if 'sentiment' in self.df.columns else 0
+                'message_count': int(row['message_count']),
+                'media_count': int(row['media_count']),
+                'avg_message_length': row['avg_length'],
+                'avg_sentiment': row['avg_sentiment']
             }
             
         return user_stats
 
     def get_activity_patterns(self) -> Dict:
         """Analyze activity patterns"""
+        cube = self.features.activity_cube
+        weekdays = cube.weekday_totals().sort_values(ascending=False, kind='stable')
+        
         return {
-            'hourly': self.df['date'].dt.hour.value_counts().sort_index().to_dict(),
-            'daily': self.df['date'].dt.day_name().value_counts().to_dict(),
-            'monthly': self.df['date'].dt.month.value_counts().sort_index().to_dict()
+            'hourly': {hour: int(count) for hour, count in cube.hourly().items() if count},
+            'daily': {day: int(count) for day, count in weekdays.items() if count},
+            'monthly': {month: int(count) for month, count in cube.monthly().items() if count}
         }
 
     def get_content_analysis(self) -> Dict:
@@ -93,11 +171,17 @@ class ChatAnalyzer:
         emoji_usage = self.df['has_emoji'].sum() if 'has_emoji' in self.df.columns else 0
         link_sharing = self.df['has_link'].sum() if 'has_link' in self.df.columns else 0
         
+        # Most used emoji sequences, from the per-message lists extracted by the parser
+        top_emojis = {}
+        if 'emojis' in self.df.columns:
+            top_emojis = {e: int(c) for e, c in self.df['emojis'].dropna().explode().value_counts().head(10).items()}
+        
         return {
             'media_types': media_types,
             'avg_sentiment': self.df['sentiment'].mean() if 'sentiment' in self.df.columns else 0,
             'emoji_usage': emoji_usage,
-            'link_sharing': link_sharing
+            'link_sharing': link_sharing,
+            'top_emojis': top_emojis
         }
         
     def get_online_time_stats(self) -> Dict:
@@ -112,30 +196,22 @@ class ChatAnalyzer:
             user_online_times = {}
             peak_online_hours = {}
             
-            for user in self.df['from'].unique():
-                # Filter messages for this user
-                user_messages = self.df[self.df['from'] == user]
+            table = self.get_user_table()
+            hours = self.get_user_hours()
+            # First hour with the most messages, as Series.mode() would pick
+            peak_hours = hours.idxmax(axis=1)
+            
+            for user, row in table.iterrows():
+                # Total time from first to last message
+                total_time = (row['last_date'] - row['first_date']).total_seconds() / 3600  # hours
                 
-                # Calculate total online time
-                if len(user_messages) > 0:
-                    # Total time from first to last message
-                    total_time = (user_messages['date'].max() - user_messages['date'].min()).total_seconds() / 3600  # hours
-                    
-                    # Most active time (hour with most messages)
-                    peak_hour = user_messages['date'].dt.hour.mode().values[0]
-                    
-                    # Hourly message distribution
-                    hourly_distribution = user_messages['date'].dt.hour.value_counts().to_dict()
-                    
-                    user_online_times[user] = {
-                        'total_hours': total_time,
-                        'peak_time': f"{peak_hour:02d}:00",
-                        'message_count': len(user_messages)
-                    }
-                    
-                    peak_online_hours[user] = [
-                        hourly_distribution.get(hour, 0) for hour in range(24)
-                    ]
+                user_online_times[user] = {
+                    'total_hours': total_time,
+                    'peak_time': f"{peak_hours[user]:02d}:00",
+                    'message_count': int(row['message_count'])
+                }
+                
+                peak_online_hours[user] = hours.loc[user].tolist()
             
             # Compute overall statistics
             stats = {
@@ -153,8 +229,7 @@ class ChatAnalyzer:
 
     def get_chat_velocity(self) -> Dict:
         """Analyze message velocity over time"""
-        self.df['day'] = self.df['date'].dt.date
-        velocity = self.df.groupby('day').size()
+        velocity = self.features.daily_counts
         
         # Calculate rolling average for smoother trends
         rolling_avg = velocity.rolling(window=7, min_periods=1).mean()
@@ -171,16 +246,16 @@ class ChatAnalyzer:
     def get_engagement_intelligence(self) -> Dict:
         """Calculate advanced engagement scores and user archetypes"""
         intelligence = {}
+        table = self.get_user_table()
+        mean_count = table['message_count'].mean()
         
-        for user in self.df['from'].unique():
-            user_msgs = self.df[self.df['from'] == user]
-            
+        for user, row in table.iterrows():
             # Basic metrics
-            count = len(user_msgs)
-            avg_len = user_msgs['text_length'].mean() if 'text_length' in self.df.columns else 0
+            count = row['message_count']
+            avg_len = row['avg_length']
             # Metrics for analysis
-            sentiment = user_msgs['sentiment'].mean() if 'sentiment' in self.df.columns else 0
-            media_ratio = (user_msgs['media_type'].notna().sum() / count) if count > 0 else 0
+            sentiment = row['avg_sentiment']
+            media_ratio = row['media_count'] / count
             
             # Engagement Score (Weighted)
             norm_count = count / len(self.df)
@@ -188,7 +263,7 @@ class ChatAnalyzer:
             
             # Archetype assignment
             archetype = "Neutral"
-            if count > self.df['from'].value_counts().mean() * 1.5: archetype = "Main Protagonist"
+            if count > mean_count * 1.5: archetype = "Main Protagonist"
             elif sentiment > 0.3: archetype = "The Optimist"
             elif sentiment < -0.3: archetype = "The Critic"
             elif media_ratio > 0.4: archetype = "Media Maven"
@@ -224,23 +299,25 @@ class ChatAnalyzer:
 
     def get_ocean_personality(self, user: str) -> Dict:
         """Calculate Big Five (OCEAN) traits for a specific user"""
-        user_msgs = self.df[self.df['from'] == user]
-        if user_msgs.empty: return {}
+        table = self.get_user_table()
+        if user not in table.index: return {}
+        row = table.loc[user]
+        count = row['message_count']
         
         # O - Openness: Media ratio + message length diversity
-        openness = (user_msgs['media_type'].notna().sum() / len(user_msgs) * 50) + (min(user_msgs['text_length'].std() if len(user_msgs) > 1 else 0, 100) / 2)
+        openness = (row['media_count'] / count * 50) + (min(row['length_std'] if count > 1 else 0, 100) / 2)
         
         # C - Conscientiousness: Regularity of messaging + text length
-        conscientiousness = (min(user_msgs['text_length'].mean(), 200) / 4) + (50 if user_msgs['date'].dt.hour.std() < 5 else 20)
+        conscientiousness = (min(row['avg_length'], 200) / 4) + (50 if row['hour_std'] < 5 else 20)
         
         # E - Extraversion: Message frequency + bursts
-        extraversion = (len(user_msgs) / (len(self.df) / self.df['from'].nunique()) * 50)
+        extraversion = (count / (len(self.df) / len(table)) * 50)
         
         # A - Agreeableness: Sentiment + care mentions
-        agreeableness = ((user_msgs['sentiment'].mean() + 1) * 25) + (user_msgs['care_mentions'].mean() * 500)
+        agreeableness = ((row['avg_sentiment'] + 1) * 25) + (row['care_rate'] * 500)
         
         # N - Neuroticism: Emotional intensity + sentiment volatility
-        neuroticism = (user_msgs['sentiment'].std() if len(user_msgs) > 1 else 0) * 100
+        neuroticism = (row['sentiment_std'] if count > 1 else 0) * 100
         
         return {
             'Openness': min(100, round(openness, 1)),
@@ -250,50 +327,98 @@ class ChatAnalyzer:
             'Neuroticism': min(100, round(neuroticism, 1))
         }
 
-    def get_conversation_bursts(self) -> List[Dict]:
-        """Identify high-intensity conversation bursts"""
-        # Sort by date
-        sorted_df = self.df.sort_values('date')
+    def get_burst_table(self, gap_seconds: float = 60, min_size: int = 10) -> pd.DataFrame:
+        """
+        Segment the chat into conversation bursts.
         
-        # Calculate time difference between consecutive messages
-        diffs = sorted_df['date'].diff().dt.total_seconds()
+        A burst is a run of messages each sent less than ``gap_seconds`` after
+        the previous one. Runs are numbered with a cumulative sum over the gaps
+        and aggregated in one groupby.
         
-        # A burst is a sequence of messages where diff < 60 seconds
-        bursts = []
-        current_burst = []
+        Args:
+            gap_seconds: Largest gap between consecutive messages of a burst
+            min_size: Minimum number of messages for a run to count as a burst
         
-        for i, diff in enumerate(diffs):
-            if pd.isna(diff) or diff < 60:
-                current_burst.append(i)
-            else:
-                if len(current_burst) >= 10:  # Minimum 10 messages for a burst
-                    burst_msgs = sorted_df.iloc[current_burst]
-                    bursts.append({
-                        'start_time': str(burst_msgs['date'].min()),
-                        'end_time': str(burst_msgs['date'].max()),
-                        'message_count': len(burst_msgs),
-                        'participants': int(burst_msgs['from'].nunique())
-                    })
-                current_burst = [i]
-                
-        # Handle last burst
-        if len(current_burst) >= 10:
-            burst_msgs = sorted_df.iloc[current_burst]
-            bursts.append({
-                'start_time': str(burst_msgs['date'].min()),
-                'end_time': str(burst_msgs['date'].max()),
-                'message_count': len(burst_msgs),
-                'participants': int(burst_msgs['from'].nunique())
-            })
-            
-        return sorted(bursts, key=lambda x: x['message_count'], reverse=True)[:5]
+        Returns:
+            DataFrame with one row per burst in chronological order: start/end time,
+            message count, participants and the sentiment trajectory (mean, opening
+            and closing half means, shift between them, and least-squares slope
+            per message)
+        """
+        return self.features.get(f'burst_table:{gap_seconds}:{min_size}',
+                                 lambda df: self._compute_burst_table(gap_seconds, min_size))
+
+    def _compute_burst_table(self, gap_seconds: float, min_size: int) -> pd.DataFrame:
+        order = self.features.date_order
+        gaps = self.features.gaps.to_numpy()[order]
+        # The first message has no gap (NaN) and opens session 0
+        session = np.cumsum(gaps >= gap_seconds)
+        
+        sentiment = self.df['sentiment'] if 'sentiment' in self.df.columns else pd.Series(0.0, index=self.df.index)
+        frame = pd.DataFrame({
+            'session': session,
+            'date': self.df['date'].to_numpy()[order],
+            'from': self.df['from'].iloc[order].to_numpy(),
+            'sentiment': sentiment.to_numpy(dtype='float64')[order],
+        })
+        grouped = frame.groupby('session', sort=True)
+        size = grouped['date'].transform('size')
+        position = grouped.cumcount()
+        frame['opening'] = frame['sentiment'].where(position < size / 2)
+        frame['closing'] = frame['sentiment'].where(position >= size / 2)
+        # Terms of the least-squares slope of sentiment over message position
+        centered = position - (size - 1) / 2
+        frame['slope_num'] = centered * frame['sentiment']
+        frame['slope_den'] = centered ** 2
+        
+        table = frame.groupby('session', sort=True).agg(
+            start_time=('date', 'min'),
+            end_time=('date', 'max'),
+            message_count=('date', 'size'),
+            participants=('from', 'nunique'),
+            mean_sentiment=('sentiment', 'mean'),
+            opening_sentiment=('opening', 'mean'),
+            closing_sentiment=('closing', 'mean'),
+            slope_num=('slope_num', 'sum'),
+            slope_den=('slope_den', 'sum'),
+        )
+        table = table[table['message_count'] >= min_size]
+        table['sentiment_shift'] = table['closing_sentiment'] - table['opening_sentiment']
+        table['sentiment_slope'] = table['slope_num'] / table['slope_den'].where(table['slope_den'] > 0)
+        return table.drop(columns=['slope_num', 'slope_den']).reset_index(drop=True)
+
+    def get_conversation_bursts(self, top: Optional[int] = 5, gap_seconds: float = 60,
+                                min_size: int = 10) -> List[Dict]:
+        """
+        Identify high-intensity conversation bursts.
+        
+        Args:
+            top: Number of largest bursts returned (None returns all, chronologically)
+            gap_seconds: Largest gap between consecutive messages of a burst
+            min_size: Minimum number of messages in a burst
+        
+        Returns:
+            List of bursts with start/end time, message count and participant count
+        """
+        table = self.get_burst_table(gap_seconds, min_size)
+        if top is not None:
+            table = table.sort_values('message_count', ascending=False, kind='stable').head(top)
+        
+        return [{
+            'start_time': str(row.start_time),
+            'end_time': str(row.end_time),
+            'message_count': int(row.message_count),
+            'participants': int(row.participants)
+        } for row in table.itertuples()]
 
     def get_executive_summary(self) -> str:
         """Generate a high-level summary of the chat's 'character'"""
-        stats = self.get_basic_stats()
-        sentiment = self.get_content_analysis().get('avg_sentiment', 0)
+        features = self.features
+        start, end = features.date_bounds
+        total_messages = len(self.df)
+        sentiment = self.df['sentiment'].mean() if 'sentiment' in self.df.columns else 0
         
-        summary = f"This dataset covers {stats['date_range']['total_days']} days of intelligence across {stats['total_participants']} participants. "
+        summary = f"This dataset covers {(end - start).days} days of intelligence across {len(features.user_counts)} participants. "
         
         if sentiment > 0.2:
             summary += "The overall emotional landscape is exceptionally positive and collaborative. "
@@ -302,7 +427,7 @@ class ChatAnalyzer:
         else:
             summary += "The conversation maintains a professional and balanced tone. "
             
-        media_ratio = stats['media_messages'] / stats['total_messages'] if stats['total_messages'] > 0 else 0
+        media_ratio = features.has_media.sum() / total_messages if total_messages > 0 else 0
         if media_ratio > 0.3:
             summary += "There is a heavy reliance on visual and media-based communication. "
         else:
@@ -310,20 +435,26 @@ class ChatAnalyzer:
             
         return summary
 
+    def _count_by_user(self, mask: pd.Series) -> Dict:
+        """Count flagged messages per user, leaving out users with none"""
+        counts = self.df.loc[mask, 'from'].value_counts()
+        # Categorical 'from' columns also report unused categories
+        return counts[counts > 0].to_dict()
+
     def get_psychological_stats(self) -> Dict:
         """Analyze health, mood, and care patterns"""
         psych = {
             'health': {
                 'total_mentions': int(self.df['health_mentions'].sum()),
-                'by_user': self.df[self.df['health_mentions']]['from'].value_counts().to_dict()
+                'by_user': self._count_by_user(self.df['health_mentions'])
             },
             'love_and_care': {
                 'total_mentions': int(self.df['care_mentions'].sum()),
-                'by_user': self.df[self.df['care_mentions']]['from'].value_counts().to_dict()
+                'by_user': self._count_by_user(self.df['care_mentions'])
             },
             'emotional_pulse': {
                 'avg_intensity': float(self.df['mood_intensity'].mean()),
-                'peak_emotional_days': self.df.groupby(self.df['date'].dt.date)['mood_intensity'].mean().nlargest(5).to_dict()
+                'peak_emotional_days': self.df['mood_intensity'].groupby(self.features.day).mean().nlargest(5).to_dict()
             }
         }
         
@@ -333,48 +464,112 @@ class ChatAnalyzer:
         # New: Health Issue Tracking
         health_msgs = self.df[self.df['health_mentions']]
         if not health_msgs.empty:
-            # Simple keyword-based categorization
-            acute_words = {'fever', 'cold', 'flu', 'cough', 'emergency', 'ambulance', 'surgery', 'pain', 'headache'}
-            chronic_words = {'diabetes', 'asthma', 'anxiety', 'depression', 'blood pressure', 'therapy', 'meds'}
+            # Keyword-based categorization, flagged by the parser's lexicon pass when available
+            if {'acute_mentions', 'chronic_mentions'}.issubset(health_msgs.columns):
+                acute = health_msgs['acute_mentions']
+                chronic = health_msgs['chronic_mentions']
+            else:
+                flags = LexiconMatcher({'acute': ACUTE_TERMS, 'chronic': CHRONIC_TERMS}).flag_frame(health_msgs['text'])
+                acute, chronic = flags['acute'], flags['chronic']
             
             psych['health_tracking'] = {
-                'acute_episodes': int(health_msgs['text'].str.contains('|'.join(acute_words), case=False).sum()),
-                'chronic_management': int(health_msgs['text'].str.contains('|'.join(chronic_words), case=False).sum()),
-                'health_velocity': self.df.groupby(self.df['date'].dt.date)['health_mentions'].sum().to_dict()
+                'acute_episodes': int(acute.sum()),
+                'chronic_management': int(chronic.sum()),
+                'health_velocity': self.df['health_mentions'].groupby(self.features.day).sum().to_dict()
             }
             # Clean dates for JSON
             psych['health_tracking']['health_velocity'] = {str(k): int(v) for k, v in psych['health_tracking']['health_velocity'].items() if v > 0}
             
         return psych
 
+    def get_interaction_matrix(self) -> Dict:
+        """
+        Count and score direct interactions between every pair of users.
+        
+        An interaction is a message answering a message from a different
+        sender: the message it replies to when it is an explicit reply,
+        otherwise the previous message (see ReplyGraph.interactions()).
+        Messages without a sender are ignored. Senders are encoded as integer
+        codes and pairs are aggregated with np.unique, so the cost does not
+        depend on the number of users.
+        
+        Returns:
+            Dictionary with 'users' (names ordered by code) and 'pairs', a DataFrame
+            in sparse coordinate form with one row per interacting unordered pair:
+            user codes and names (user_a < user_b), interaction count and mean
+            sentiment of the responding messages. When scipy is installed,
+            'counts' and 'sentiment' hold the same data as upper-triangular
+            scipy.sparse CSR matrices.
+        """
+        return self.features.get('interactions', lambda df: self._compute_interactions())
+
+    def _compute_interactions(self) -> Dict:
+        answers = self.get_reply_graph().interactions()
+        # Sorted factorization keeps codes in name order, so lo/hi codes give name-sorted pairs
+        codes, users = pd.factorize(self.df['from'], sort=True)
+        users = list(users)
+        
+        if 'sentiment' in self.df.columns:
+            sentiment = self.df['sentiment'].to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            sentiment = np.zeros(len(self.df))
+        
+        responders = codes[answers['position'].to_numpy()]
+        targets = codes[answers['target_position'].to_numpy()]
+        low = np.minimum(responders, targets).astype('int64')
+        high = np.maximum(responders, targets).astype('int64')
+        response_sentiment = sentiment[answers['position'].to_numpy()]
+        
+        keys, inverse, counts = np.unique(low * len(users) + high, return_inverse=True, return_counts=True)
+        scored = ~np.isnan(response_sentiment)
+        sentiment_sums = np.bincount(inverse[scored], weights=response_sentiment[scored], minlength=len(keys))
+        scored_counts = np.bincount(inverse[scored], minlength=len(keys))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_sentiment = sentiment_sums / scored_counts
+        
+        code_a, code_b = np.divmod(keys, len(users)) if len(users) else (keys, keys)
+        names = np.asarray(users, dtype=object)
+        pairs = pd.DataFrame({
+            'code_a': code_a,
+            'code_b': code_b,
+            'user_a': names[code_a],
+            'user_b': names[code_b],
+            'count': counts,
+            'mean_sentiment': mean_sentiment,
+        })
+        
+        matrix = {'users': users, 'pairs': pairs}
+        if SCIPY_AVAILABLE:
+            shape = (len(users), len(users))
+            matrix['counts'] = sparse.csr_matrix((counts, (code_a, code_b)), shape=shape)
+            matrix['sentiment'] = sparse.csr_matrix((mean_sentiment, (code_a, code_b)), shape=shape)
+        return matrix
+
+    def get_reply_graph(self) -> ReplyGraph:
+        """
+        Thread structure of the explicit replies.
+        
+        Returns:
+            ReplyGraph of the messages, shared by the interaction analyses
+        """
+        return self.features.reply_graph
+
+    def get_reply_stats(self) -> Dict:
+        """Summarize reply threads, reply latency and per-user reply behaviour"""
+        return self.get_reply_graph().summary()
+
     def get_social_dynamics(self) -> Dict:
         """Analyze relationships and harmony between users"""
         dynamics = {}
         
-        # Get users who interact (sequential messages)
-        interactions = []
-        users = self.df['from'].dropna().tolist()
-        sentiments = self.df['sentiment'].tolist()
-        
-        for i in range(len(users) - 1):
-            if users[i] != users[i+1]:
-                pair = tuple(sorted((users[i], users[i+1])))
-                # Use the sentiment of the responding message as a proxy for harmony
-                interactions.append({
-                    'pair': pair,
-                    'sentiment': sentiments[i+1]
-                })
-        
-        if not interactions:
+        pairs = self.get_interaction_matrix()['pairs']
+        if pairs.empty:
             return {}
-            
-        inter_df = pd.DataFrame(interactions)
-        harmony = inter_df.groupby('pair')['sentiment'].mean().to_dict()
-        intensity = inter_df.groupby('pair').size().to_dict()
         
         # Convert pairs to strings for JSON
-        dynamics['harmony_matrix'] = {f"{p[0]} <-> {p[1]}": float(s) for p, s in harmony.items()}
-        dynamics['interaction_intensity'] = {f"{p[0]} <-> {p[1]}": int(i) for p, i in intensity.items()}
+        labels = [f"{a} <-> {b}" for a, b in zip(pairs['user_a'], pairs['user_b'])]
+        dynamics['harmony_matrix'] = dict(zip(labels, pairs['mean_sentiment'].astype(float)))
+        dynamics['interaction_intensity'] = dict(zip(labels, pairs['count'].astype(int)))
         
         # Identify "Most Harmonious" and "Most Intense" pairs
         if dynamics['harmony_matrix']:
@@ -384,70 +579,469 @@ class ChatAnalyzer:
             
         return dynamics
 
-    def get_semantic_concepts(self) -> List[Dict]:
-        """Extract key concepts and thematic clusters"""
-        # Simple N-gram frequency analysis (bigrams)
-        from collections import Counter
-        import re
+    def _message_ngrams(self, text, order: int) -> List[str]:
+        """N-grams of one message's words, skipping stopwords and words under four letters"""
+        if not isinstance(text, str) or not text:
+            return []
+        words = [w for w in CONCEPT_WORD_PATTERN.findall(text.lower()) if w not in self.stop_words]
+        return list(iter_ngrams(words, order))
+
+    @staticmethod
+    def _format_concepts(sketch: SpaceSaving, top: int) -> List[Dict]:
+        return [{'concept': c, 'relevance': int(count)} for c, count in sketch.most_common(top)]
+
+    def get_semantic_concepts(self, order: int = 2, top: int = 15, capacity: int = 50000) -> List[Dict]:
+        """
+        Extract key concepts as the most frequent n-grams.
+        
+        Messages are tokenized one at a time and their n-grams are counted in
+        a Space-Saving sketch, so memory stays bounded by ``capacity`` rather
+        than by the size of the chat. Counts are exact while the chat has fewer
+        distinct n-grams than ``capacity``.
+        
+        Args:
+            order: Words per n-gram (2 for bigrams)
+            top: Number of concepts returned
+            capacity: Number of n-grams the sketch tracks
+        
+        Returns:
+            List of concepts with their estimated counts, most frequent first
+        """
+        sketch = SpaceSaving(capacity)
+        for text in self.df['text']:
+            sketch.update(self._message_ngrams(text, order))
+        return self._format_concepts(sketch, top)
+
+    def get_concepts_by_user(self, order: int = 2, top: int = 5, capacity: int = 2000) -> Dict[str, List[Dict]]:
+        """
+        Extract each user's most frequent n-grams.
         
-        text = " ".join(self.df['text'].dropna().astype(str).tolist()).lower()
-        words = re.findall(r'\b[a-z]{4,}\b', text)
-        words = [w for w in words if w not in self.stop_words]
+        Args:
+            order: Words per n-gram
+            top: Number of concepts per user
+            capacity: Number of n-grams tracked per user
         
-        bigrams = [" ".join(pair) for pair in zip(words, words[1:])]
-        concept_counts = Counter(bigrams).most_common(15)
+        Returns:
+            Dictionary mapping each user to their concepts
+        """
+        messages = zip(self.df['from'], self.df['text'])
+        sketches = count_by_key(
+            ((user, self._message_ngrams(text, order)) for user, text in messages if pd.notna(user)),
+            capacity
+        )
+        return {user: self._format_concepts(sketch, top) for user, sketch in sketches.items()}
+
+    def get_concepts_by_window(self, freq: str = 'M', order: int = 2, top: int = 5,
+                               capacity: int = 5000) -> Dict[str, List[Dict]]:
+        """
+        Extract the most frequent n-grams of each time window.
+        
+        Args:
+            freq: Pandas period frequency of the windows ('W', 'M', 'Q', ...)
+            order: Words per n-gram
+            top: Number of concepts per window
+            capacity: Number of n-grams tracked per window
         
-        return [{'concept': c, 'relevance': int(count)} for c, count in concept_counts]
+        Returns:
+            Dictionary mapping each window (e.g. '2024-03') to its concepts, in chronological order
+        """
+        order_index = self.features.date_order
+        periods = self.df['date'].iloc[order_index].dt.to_period(freq).astype(str)
+        texts = self.df['text'].iloc[order_index]
+        sketches = count_by_key(
+            ((period, self._message_ngrams(text, order)) for period, text in zip(periods, texts)),
+            capacity
+        )
+        return {period: self._format_concepts(sketch, top) for period, sketch in sketches.items()}
 
     def get_user_dna(self) -> Dict:
         """Generate unique DNA fingerprints for each user"""
         dna = {}
-        for user in self.df['from'].unique():
-            user_msgs = self.df[self.df['from'] == user]
-            if len(user_msgs) == 0: continue
-            
+        for user, row in self.get_user_table().iterrows():
             # Encode metrics into a DNA string
             # Length (0-9), Sentiment (A-Z), Media (0-9), Timing (A-Z)
-            l_val = min(9, int(user_msgs['text_length'].mean() / 20))
-            s_val = chr(65 + min(25, int((user_msgs['sentiment'].mean() + 1) * 12.5)))
-            m_val = min(9, int((user_msgs['media_type'].notna().sum() / len(user_msgs)) * 10))
-            t_val = chr(65 + int(user_msgs['date'].dt.hour.mean()))
+            l_val = min(9, int(row['avg_length'] / 20))
+            s_val = chr(65 + min(25, int((row['avg_sentiment'] + 1) * 12.5)))
+            m_val = min(9, int((row['media_count'] / row['message_count']) * 10))
+            t_val = chr(65 + int(row['avg_hour']))
             
             dna[user] = f"DNA-{l_val}{s_val}{m_val}{t_val}"
             
         return dna
 
-    def get_stability_index(self) -> Dict:
-        """Detect conflict escalations and overall group stability"""
-        bursts = self.get_conversation_bursts()
+    def get_stability_index(self, bursts: Optional[pd.DataFrame] = None) -> Dict:
+        """
+        Detect conflict escalations and overall group stability.
+        
+        Each burst gets an escalation score from 0 to 100 for how far its
+        sentiment falls from its opening half to its closing half. The index
+        is 100 minus the message-weighted mean score over all bursts.
+        
+        Args:
+            bursts: Burst table from get_burst_table(), computed with defaults if not given
+        """
+        if bursts is None:
+            bursts = self.get_burst_table()
         stability = {
             'index': 100.0,
             'escalations': [],
             'status': 'Stable'
         }
+        if bursts.empty:
+            return stability
         
-        total_escalation = 0
-        for burst in bursts:
-            # Check for sharp sentiment drop within the burst
-            # For simplicity, we compare start vs end sentiment if available
-            pass # Simplified logic for now
-            
+        # A drop of 2 (from fully positive to fully negative) scores 100
+        scores = (-bursts['sentiment_shift']).clip(lower=0, upper=2).fillna(0) * 50
+        weights = bursts['message_count']
+        stability['index'] = round(100.0 - float((scores * weights).sum() / weights.sum()), 1)
+        
+        # Sharp drops (at least 0.3) into negative territory count as escalations
+        escalated = bursts[(scores >= ESCALATION_SCORE) & (bursts['closing_sentiment'] < 0)]
+        for idx, burst in escalated.assign(score=scores).nlargest(5, 'score').iterrows():
+            stability['escalations'].append({
+                'start_time': str(burst['start_time']),
+                'end_time': str(burst['end_time']),
+                'message_count': int(burst['message_count']),
+                'sentiment_shift': round(float(burst['sentiment_shift']), 3),
+                'escalation_score': round(float(burst['score']), 1)
+            })
+        
+        if stability['index'] < 60:
+            stability['status'] = 'Volatile'
+        elif stability['index'] < 85 or escalated.shape[0] > 0:
+            stability['status'] = 'Tense'
         return stability
 
-    def get_all_stats(self) -> Dict:
-        """Get all available statistics including advanced intelligence"""
+    @staticmethod
+    def _requested_sections(sections: Optional[Iterable[str]]) -> List[str]:
+        """Validated list of requested sections (all reported sections when None)"""
+        if sections is None:
+            return [name for name in STAT_SECTIONS if name not in INTERMEDIATE_SECTIONS]
+        requested = list(sections)
+        unknown = [name for name in requested if name not in STAT_SECTIONS or name in INTERMEDIATE_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown statistics sections: {', '.join(unknown)}")
+        return requested
+
+    def _resolve_sections(self, sections: Optional[Iterable[str]]) -> List[str]:
+        """Expand requested sections with their dependencies, in dependency order"""
+        requested = self._requested_sections(sections)
+        ordered = []
+        def visit(name):
+            if name in ordered:
+                return
+            for dependency in STAT_SECTIONS[name][1]:
+                visit(dependency)
+            ordered.append(name)
+        for name in requested:
+            visit(name)
+        return ordered
+
+    def _run_section(self, name: str, results: Dict) -> Tuple[object, float]:
+        """Run one section with its dependencies' results, returning the result and elapsed seconds"""
+        method, dependencies = STAT_SECTIONS[name]
+        start = time.perf_counter()
+        result = getattr(self, method)(*[results[dependency] for dependency in dependencies])
+        return result, time.perf_counter() - start
+
+    def get_all_stats(self, sections: Optional[Iterable[str]] = None, workers: int = 1) -> Dict:
+        """
+        Get all available statistics including advanced intelligence.
+        
+        Args:
+            sections: Names of the sections to compute (see STAT_SECTIONS); all when None.
+                Sections they depend on are computed as well but not returned.
+            workers: Threads running independent sections concurrently (1 runs them in order)
+        
+        Returns:
+            Dictionary of section results, plus 'section_timings' with the seconds
+            each computed section took
+        """
+        ordered = self._resolve_sections(sections)
+        results = {}
+        timings = {}
+        
+        if workers <= 1:
+            for name in ordered:
+                results[name], timings[name] = self._run_section(name, results)
+        else:
+            # Warm the shared features once so sections do not wait on each other for them
+            self.features.user_table
+            remaining = list(ordered)
+            running = {}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while remaining or running:
+                    for name in list(remaining):
+                        if all(dependency in results for dependency in STAT_SECTIONS[name][1]):
+                            remaining.remove(name)
+                            running[pool.submit(self._run_section, name, results)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name], timings[name] = future.result()
+        
+        requested = set(self._requested_sections(sections))
+        stats = {name: results[name] for name in ordered if name in requested}
+        stats['section_timings'] = {name: round(timings[name], 4) for name in ordered}
+        return stats
+
+    def window(self, start=None, end=None) -> 'ChatAnalyzer':
+        """
+        Analyzer over the messages dated in [start, end).
+        
+        The window is located by binary search on the date-sorted messages. When
+        the DataFrame is sorted by date (as parsed), the window's DataFrame is a
+        positional slice that is not copied, and per-message features already
+        computed here are sliced rather than recomputed.
+        
+        Args:
+            start: First date included, as a timestamp or date string (unbounded when None)
+            end: First date excluded (unbounded when None)
+        
+        Returns:
+            ChatAnalyzer for the window
+        """
+        return self._view(self.features.window_rows(start, end))
+
+    def _view(self, rows) -> 'ChatAnalyzer':
+        """Analyzer over a subset of the rows, reusing the per-message features computed here"""
+        df = self.df.iloc[rows]
+        return type(self)(df, stop_words=self.stop_words, _features=self.features.subset(df, rows))
+
+    def _window_stats(self, bounds: Iterable[Tuple[str, pd.Timestamp, pd.Timestamp]],
+                      sections: Optional[Iterable[str]], workers: int) -> Dict[str, Dict]:
+        """Run get_all_stats on each non-empty window of (label, start, end) bounds"""
+        sections = None if sections is None else list(sections)
+        self._resolve_sections(sections)
+        
+        results = {}
+        for label, start, end in bounds:
+            view = self.window(start, end)
+            if len(view.df):
+                results[label] = view.get_all_stats(sections=sections, workers=workers)
+        return results
+
+    def get_windowed_stats(self, sections: Optional[Iterable[str]] = None, freq: str = 'M',
+                           workers: int = 1) -> Dict[str, Dict]:
+        """
+        Compute statistics sections separately for each calendar period.
+        
+        Args:
+            sections: Names of the sections to compute (see STAT_SECTIONS); all when None
+            freq: Pandas period frequency ('D', 'W', 'M', 'Q', 'Y', ...)
+            workers: Threads running independent sections of a window concurrently
+        
+        Returns:
+            Dictionary mapping each period with messages (e.g. '2024-03') to its
+            get_all_stats() result, in chronological order
+        """
+        if self.df.empty:
+            return {}
+        first, last = self.features.date_bounds
+        periods = pd.period_range(first.to_period(freq), last.to_period(freq), freq=freq)
+        bounds = ((str(period), period.start_time, (period + 1).start_time) for period in periods)
+        return self._window_stats(bounds, sections, workers)
+
+    def get_rolling_stats(self, sections: Optional[Iterable[str]] = None, window: str = '30D',
+                          step: str = '7D', workers: int = 1) -> Dict[str, Dict]:
+        """
+        Compute statistics sections over rolling time windows.
+        
+        Windows span ``window`` and advance by ``step``; the first one starts at
+        the first message and the last one is the first to reach past the last
+        message.
+        
+        Args:
+            sections: Names of the sections to compute (see STAT_SECTIONS); all when None
+            window: Window length as a pandas timedelta string
+            step: Distance between consecutive windows
+            workers: Threads running independent sections of a window concurrently
+        
+        Returns:
+            Dictionary mapping each window's end (ISO timestamp, exclusive) to its
+            get_all_stats() result, in chronological order
+        """
+        if self.df.empty:
+            return {}
+        window, step = pd.Timedelta(window), pd.Timedelta(step)
+        if step <= pd.Timedelta(0):
+            raise ValueError("step must be positive")
+        first, last = self.features.date_bounds
+        
+        def bounds():
+            end = first + window
+            while True:
+                yield end.isoformat(), end - window, end
+                if end > last:
+                    break
+                end += step
+        return self._window_stats(bounds(), sections, workers)
+
+    def submit_all_stats(self, sections: Optional[Iterable[str]] = None, workers: int = 1) -> Future:
+        """
+        Start get_all_stats() on a background thread.
+        
+        Args:
+            sections: Names of the sections to compute; all when None
+            workers: Threads running independent sections concurrently
+        
+        Returns:
+            Future resolving to the get_all_stats() result
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-stats')
+        future = executor.submit(self.get_all_stats, sections, workers)
+        executor.shutdown(wait=False)
+        return future
+
+    def stratified_sample(self, fraction: float = 0.05, min_per_stratum: int = 2,
+                          random_state: Optional[int] = 0) -> StratifiedSample:
+        """
+        Draw a sample of the messages stratified by user and month.
+        
+        Args:
+            fraction: Share of each user's messages sampled in every month
+            min_per_stratum: Minimum messages sampled per user and month
+            random_state: Seed of the random generator
+        
+        Returns:
+            StratifiedSample whose 'positions' are row positions in the DataFrame
+        """
+        users = pd.Categorical(self.df['from']).codes.astype(np.int64) + 1
+        dates = self.df['date']
+        months = (dates.dt.year.to_numpy(dtype=np.int64) * 12 + dates.dt.month.to_numpy(dtype=np.int64))
+        months -= months.min() if len(months) else 0
+        _, strata = np.unique(users * (int(months.max(initial=0)) + 1) + months, return_inverse=True)
+        return StratifiedSample(strata, fraction, min_per_stratum, random_state)
+
+    def _sample_estimates(self, sample: StratifiedSample, confidence: float) -> Dict:
+        """Confidence intervals for the main means and counts of the full chat"""
+        features = self.features
+        rows = sample.positions
+        sentiment = (self.df['sentiment'] if 'sentiment' in self.df.columns
+                     else pd.Series(0.0, index=self.df.index)).to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+        length = features.text_length.to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+        media = features.has_media.to_numpy(dtype=np.float64)[rows]
+        hours = features.hour.to_numpy()[rows]
+        
+        # Sender of each stratum; strata never mix senders
+        senders = self.df['from'].iloc[rows].to_numpy(dtype=object)
+        stratum_users = np.empty(len(sample.population_sizes), dtype=object)
+        stratum_users[sample.strata] = senders
+        stratum_users = np.array([None if pd.isna(user) else str(user) for user in stratum_users], dtype=object)
+        named = np.array([user is not None for user in stratum_users])
+        
+        def per_user(values):
+            # Strata of messages without a sender are left out of the per-user estimates
+            estimates = sample.mean(np.where(named[sample.strata], values, np.nan),
+                                    np.where(named, stratum_users, ''), confidence)
+            estimates.pop('', None)
+            return estimates
+        
+        user_sentiment, user_length = per_user(sentiment), per_user(length)
+        user_counts = features.user_counts
         return {
-            'basic_stats': self.get_basic_stats(),
-            'user_stats': self.get_user_stats(),
-            'activity_patterns': self.get_activity_patterns(),
-            'content_analysis': self.get_content_analysis(),
-            'chat_velocity': self.get_chat_velocity(),
-            'engagement_intelligence': self.get_engagement_intelligence(),
-            'conversation_bursts': self.get_conversation_bursts(),
-            'executive_summary': self.get_executive_summary(),
-            'psychological_stats': self.get_psychological_stats(),
-            'social_dynamics': self.get_social_dynamics(),
-            'semantic_concepts': self.get_semantic_concepts(),
-            'user_dna': self.get_user_dna(),
-            'stability_index': self.get_stability_index()
-        }
\ No newline at end of file
+            'avg_sentiment': sample.mean(sentiment, confidence=confidence),
+            'avg_message_length': sample.mean(length, confidence=confidence),
+            'media_messages': sample.total(media, confidence=confidence),
+            'hourly': {hour: sample.total((hours == hour).astype(np.float64), confidence=confidence)
+                       for hour in range(24)},
+            'users': {
+                str(user): {
+                    'message_count': int(count),
+                    'avg_sentiment': user_sentiment.get(str(user)),
+                    'avg_message_length': user_length.get(str(user)),
+                }
+                for user, count in user_counts.items()
+            },
+        }
+
+    def _scale_sample_counts(self, results: Dict, view: 'ChatAnalyzer'):
+        """Scale the counts of sections computed on a sample to the full chat, in place"""
+        chat_factor = len(self.df) / len(view.df) if len(view.df) else 0.0
+        user_counts = self.features.user_counts
+        sample_counts = view.features.user_counts.reindex(user_counts.index)
+        user_factors = {str(user): count / sample_counts[user] if sample_counts[user] > 0 else 0.0
+                        for user, count in user_counts.items()}
+        
+        def scale(value, factor):
+            return int(round(float(value) * factor))
+        
+        def scale_mapping(mapping, factor=None):
+            return {key: scale(value, user_factors.get(str(key), chat_factor) if factor is None else factor)
+                    for key, value in mapping.items()}
+        
+        if 'user_stats' in results:
+            for user, user_stats in results['user_stats'].items():
+                user_stats['message_count'] = int(user_counts.get(user, user_stats['message_count']))
+                user_stats['media_count'] = scale(user_stats['media_count'], user_factors.get(str(user), chat_factor))
+        
+        if 'content_analysis' in results:
+            content = results['content_analysis']
+            for key in ('emoji_usage', 'link_sharing'):
+                content[key] = scale(content[key], chat_factor)
+            for key in ('media_types', 'top_emojis'):
+                content[key] = scale_mapping(content[key], chat_factor)
+        
+        if 'psychological_stats' in results:
+            psychological = results['psychological_stats']
+            for key in ('health', 'love_and_care'):
+                psychological[key]['total_mentions'] = scale(psychological[key]['total_mentions'], chat_factor)
+                psychological[key]['by_user'] = scale_mapping(psychological[key]['by_user'])
+            tracking = psychological.get('health_tracking')
+            if tracking:
+                for key in ('acute_episodes', 'chronic_management'):
+                    tracking[key] = scale(tracking[key], chat_factor)
+                tracking['health_velocity'] = scale_mapping(tracking['health_velocity'], chat_factor)
+
+    def get_approximate_stats(self, sections: Optional[Iterable[str]] = None, fraction: float = 0.05,
+                              workers: int = 1, confidence: float = 0.95,
+                              random_state: Optional[int] = 0) -> Dict:
+        """
+        Get statistics quickly from a sample of the messages stratified by user and month.
+        
+        Sections are computed on the sample, except those in EXACT_SECTIONS,
+        which are cheap or need every message and still run over all of them.
+        Averages and distributions of sampled sections estimate those of the
+        full chat, and their counts are scaled to it by each user's (or the
+        whole chat's) sampling fraction. The 'approximation' entry gives
+        confidence intervals for the main means and counts of the full chat.
+        Use submit_all_stats() to follow up with the exact run in the background.
+        
+        Args:
+            sections: Names of the sections to compute (see STAT_SECTIONS); all when None
+            fraction: Share of each user's messages sampled in every month
+            workers: Threads running independent sections concurrently
+            confidence: Confidence level of the intervals
+            random_state: Seed of the sampling
+        
+        Returns:
+            Dictionary of section results as returned by get_all_stats(), plus 'approximation'
+        """
+        requested = self._requested_sections(sections)
+        sampled = [name for name in requested if name not in EXACT_SECTIONS]
+        exact = [name for name in requested if name in EXACT_SECTIONS]
+        
+        sample = self.stratified_sample(fraction, random_state=random_state)
+        self.logger.info(f"Approximating statistics from {sample.size} of {sample.population_size} messages")
+        
+        view = self._view(sample.positions)
+        results = {'section_timings': {}}
+        for analyzer, names in ((view, sampled), (self, exact)):
+            if names:
+                partial = analyzer.get_all_stats(sections=names, workers=workers)
+                results['section_timings'].update(partial.pop('section_timings'))
+                results.update(partial)
+        self._scale_sample_counts(results, view)
+        
+        stats = {name: results[name] for name in requested}
+        stats['section_timings'] = results['section_timings']
+        stats['approximation'] = {
+            'fraction': fraction,
+            'confidence': confidence,
+            'sample_size': sample.size,
+            'population_size': sample.population_size,
+            'strata': len(sample.population_sizes),
+            'exact_sections': exact,
+            'estimates': self._sample_estimates(sample, confidence),
+        }
+        return stats
@@ -0,0 +1,180 @@
+"""
+Batch ingestion of several exports, or of multi-chat exports, into one DataFrame.
+"""
+
+import os
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .parser import TelegramDataParser
+from .schema import apply_compact_schema
+from .streaming import StreamingExportReader, MESSAGES_PATH, ACCOUNT_CHATS_PATH, COMBINED_CHATS_PATH
+
+# Arrays that hold chats or messages, in the order they are looked for
+EXPORT_LAYOUTS = (MESSAGES_PATH, ACCOUNT_CHATS_PATH, COMBINED_CHATS_PATH)
+
+
+def _label_chat(df: pd.DataFrame, chat_info: Dict) -> pd.DataFrame:
+    """Add the chat identifier columns to a processed chat"""
+    df['chat_id'] = chat_info.get('id')
+    df['chat_name'] = chat_info.get('name')
+    return df
+
+
+def _process_export_file(json_file: str, options: Dict) -> Tuple[Dict, pd.DataFrame]:
+    """Parse one single-chat export file inside a worker process"""
+    parser = TelegramDataParser(json_file, **options)
+    df = parser.process_messages()
+    return parser.chat_info, _label_chat(df, parser.chat_info)
+
+
+def _process_chat(chat: Dict, options: Dict) -> Tuple[Dict, pd.DataFrame]:
+    """Parse one chat of a multi-chat export inside a worker process"""
+    parser = TelegramDataParser.from_dict(chat, **options)
+    df = parser.process_messages()
+    return parser.chat_info, _label_chat(df, parser.chat_info)
+
+
+class BatchIngestor:
+    """
+    Parses many Telegram exports into a single messages DataFrame.
+
+    Accepts any mix of single-chat exports, full-account exports (chats under
+    ``chats.list``) and files written by the HTML converter's combined mode
+    (chats under ``chats``). Every chat is parsed by TelegramDataParser in a
+    worker process, and the results are concatenated with 'chat_id' and
+    'chat_name' columns identifying the source chat.
+    """
+
+    def __init__(self, workers: Optional[int] = None, streaming: bool = False, batch_size: int = 10000,
+                 sentiment_workers: Optional[int] = 1, cache_dir: Optional[str] = None,
+                 max_pending: Optional[int] = None, incremental: bool = False):
+        """
+        Initialize the batch ingestor.
+
+        Args:
+            workers: Worker processes parsing chats in parallel (None uses all CPUs,
+                1 parses in-process)
+            streaming: Stream exports from disk instead of loading them whole
+            batch_size: Number of messages converted to a DataFrame at a time
+            sentiment_workers: Sentiment worker processes, only used when chats are
+                parsed in-process (pool workers always score serially)
+            cache_dir: Directory for persistent caches shared across runs (disabled if None)
+            max_pending: Maximum number of chats queued for the workers at once,
+                which bounds memory when reading large account exports
+            incremental: Only process messages newer than each chat's stored
+                dataset (see TelegramDataParser)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or os.cpu_count() or 1
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.sentiment_workers = sentiment_workers
+        self.cache_dir = cache_dir
+        self.max_pending = max_pending or self.workers * 2
+        self.incremental = incremental
+        self.chats = []
+
+    def _options(self, in_process: bool) -> Dict:
+        """Parser options for one chat"""
+        return {
+            'streaming': self.streaming,
+            'batch_size': self.batch_size,
+            'sentiment_workers': self.sentiment_workers if in_process else 1,
+            'cache_dir': self.cache_dir,
+            'incremental': self.incremental,
+        }
+
+    def detect_layout(self, json_file: str) -> Tuple[str, ...]:
+        """
+        Determine whether a file holds one chat or many.
+
+        Args:
+            json_file: Path to an export JSON file
+
+        Returns:
+            Key path of the array found: MESSAGES_PATH, ACCOUNT_CHATS_PATH or COMBINED_CHATS_PATH
+        """
+        layout = StreamingExportReader(json_file).locate(EXPORT_LAYOUTS)
+        if layout is None:
+            raise ValueError(f"Invalid JSON structure in {json_file}: no 'messages' or 'chats' array found")
+        return layout
+
+    def _iter_tasks(self, json_files: Iterable[str]) -> Iterator[Tuple]:
+        """Yield one (function, payload, source) task per chat"""
+        for json_file in json_files:
+            layout = self.detect_layout(json_file)
+            if layout == MESSAGES_PATH:
+                yield _process_export_file, json_file, json_file
+                continue
+            self.logger.info(f"Reading chats from multi-chat export {json_file}")
+            for index, chat in enumerate(StreamingExportReader(json_file).iter_items(layout)):
+                # Account exports also list chats without a message history
+                if isinstance(chat, dict) and chat.get('messages') is not None:
+                    yield _process_chat, chat, f"{json_file}#{index}"
+
+    def process(self, json_files: Iterable[str]) -> pd.DataFrame:
+        """
+        Parse every chat of every file into one DataFrame.
+
+        Chats that fail to parse are logged and skipped. After the call,
+        ``self.chats`` lists the chat information of every parsed chat.
+
+        Args:
+            json_files: Paths of the export JSON files
+
+        Returns:
+            DataFrame of all messages sorted by date, with 'chat_id' and 'chat_name' columns
+        """
+        json_files = list(json_files)
+        self.chats = []
+        results = {}
+
+        if self.workers <= 1 or (len(json_files) == 1 and self.detect_layout(json_files[0]) == MESSAGES_PATH):
+            options = self._options(in_process=True)
+            for order, (func, payload, source) in enumerate(self._iter_tasks(json_files)):
+                try:
+                    results[order] = func(payload, options)
+                except Exception as e:
+                    self.logger.error(f"Error processing {source}: {str(e)}")
+        else:
+            results = self._process_parallel(json_files)
+
+        if not results:
+            raise ValueError("No chats could be parsed from the given files")
+
+        # Concatenate in input order so equal timestamps keep a deterministic order
+        ordered = [results[order] for order in sorted(results)]
+        self.chats = [chat_info for chat_info, _ in ordered]
+        df = pd.concat([frame for _, frame in ordered], ignore_index=True)
+        df = df.sort_values('date', kind='stable').reset_index(drop=True)
+
+        # Categories differ between chats, so concat falls back to object columns
+        apply_compact_schema(df)
+
+        self.logger.info(f"Parsed {len(df)} messages from {len(self.chats)} chats")
+        return df
+
+    def _process_parallel(self, json_files: List[str]) -> Dict[int, Tuple[Dict, pd.DataFrame]]:
+        """Run the chat tasks on a process pool, keeping at most max_pending queued"""
+        options = self._options(in_process=False)
+        results = {}
+        pending = {}
+
+        def collect(done):
+            for future in done:
+                order, source = pending.pop(future)
+                try:
+                    results[order] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error processing {source}: {str(e)}")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for order, (func, payload, source) in enumerate(self._iter_tasks(json_files)):
+                if len(pending) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[pool.submit(func, payload, options)] = (order, source)
+            collect(wait(pending).done)
+        return results
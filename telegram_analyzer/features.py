@@ -0,0 +1,276 @@
+"""
+Memoized derived columns shared by the analysis methods.
+"""
+
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from .activity_cube import ActivityCube
+from .reply_graph import ReplyGraph
+from typing import Any, Callable, Optional, Tuple, Union
+
+# Per-row features that stay valid on a subset of the rows
+ROW_FEATURES = ('hour', 'day', 'day_name', 'month', 'text_length', 'has_media')
+
+
+class FeatureStore:
+    """
+    Lazily computes and caches columns and aggregates derived from a messages DataFrame.
+
+    Every feature is computed at most once and reused until the underlying
+    DataFrame changes. A change is detected when a different DataFrame is
+    bound, or when the bound one changes shape or columns; in-place edits of
+    existing values need an explicit invalidate(). Features never modify the
+    DataFrame itself, and computing them is safe from several threads.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Initialize the feature store.
+
+        Args:
+            df: DataFrame containing processed chat messages
+        """
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._feature_locks = {}
+        self._values = {}
+        self.df = df
+        self._signature = self._signature_of(df)
+
+    @staticmethod
+    def _signature_of(df: pd.DataFrame) -> Tuple:
+        return id(df), df.shape, tuple(df.columns)
+
+    def bind(self, df: pd.DataFrame):
+        """Point the store at a DataFrame, dropping cached features if it changed"""
+        with self._lock:
+            self._check(df)
+
+    def invalidate(self):
+        """Drop every cached feature"""
+        with self._lock:
+            self._values.clear()
+
+    def _check(self, df: pd.DataFrame):
+        """Reset the cache if ``df`` differs from the frame the features were computed on"""
+        signature = self._signature_of(df)
+        if signature != self._signature:
+            self.df = df
+            self._signature = signature
+            self._values.clear()
+
+    def get(self, name: str, compute: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        Return a cached feature, computing it on first use.
+
+        Args:
+            name: Feature name used as cache key
+            compute: Function building the feature from the DataFrame
+
+        Returns:
+            The feature value
+        """
+        with self._lock:
+            self._check(self.df)
+            if name in self._values:
+                return self._values[name]
+            feature_lock = self._feature_locks.setdefault(name, threading.Lock())
+            df, signature = self.df, self._signature
+
+        # Features are computed outside the store lock so independent ones can
+        # run concurrently; the per-feature lock stops duplicate work
+        with feature_lock:
+            with self._lock:
+                if name in self._values and self._signature == signature:
+                    return self._values[name]
+            value = compute(df)
+            with self._lock:
+                if self._signature == signature:
+                    self._values[name] = value
+            return value
+
+    def subset(self, df: pd.DataFrame, rows: Union[slice, np.ndarray]) -> 'FeatureStore':
+        """
+        Create the store of a row subset, reusing the per-row features already computed here.
+
+        Args:
+            df: The subset DataFrame, i.e. ``self.df.iloc[rows]``
+            rows: Row positions of the subset in this store's DataFrame
+
+        Returns:
+            FeatureStore bound to ``df``
+        """
+        store = FeatureStore(df)
+        with self._lock:
+            self._check(self.df)
+            computed = {name: self._values[name] for name in ROW_FEATURES if name in self._values}
+        store._values.update({name: value.iloc[rows] for name, value in computed.items()})
+        return store
+
+    # Calendar parts
+
+    @property
+    def hour(self) -> pd.Series:
+        """Hour of day of each message"""
+        return self.get('hour', lambda df: df['date'].dt.hour)
+
+    @property
+    def day(self) -> pd.Series:
+        """Calendar date of each message"""
+        return self.get('day', lambda df: df['date'].dt.date)
+
+    @property
+    def day_name(self) -> pd.Series:
+        """Weekday name of each message"""
+        return self.get('day_name', lambda df: df['date'].dt.day_name())
+
+    @property
+    def month(self) -> pd.Series:
+        """Month number of each message"""
+        return self.get('month', lambda df: df['date'].dt.month)
+
+    @property
+    def date_bounds(self) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """Dates of the first and last message"""
+        return self.get('date_bounds', lambda df: (df['date'].min(), df['date'].max()))
+
+    # Per-message values
+
+    @property
+    def text_length(self) -> pd.Series:
+        """Text length of each message, from the parser's column when present"""
+        return self.get(
+            'text_length',
+            lambda df: df['text_length'] if 'text_length' in df.columns else df['text'].str.len()
+        )
+
+    @property
+    def has_media(self) -> pd.Series:
+        """Whether each message carries media"""
+        return self.get('has_media', lambda df: df['media_type'].notna())
+
+    @property
+    def date_order(self) -> np.ndarray:
+        """Row positions of the messages sorted by date (stable for equal timestamps)"""
+        return self.get('date_order', lambda df: np.argsort(df['date'].to_numpy(), kind='stable'))
+
+    @property
+    def sorted_dates(self) -> np.ndarray:
+        """Message dates in date order, as naive (UTC for tz-aware columns) datetime64 values"""
+        return self.get('sorted_dates', lambda df: df['date'].to_numpy(dtype='datetime64[ns]')[self.date_order])
+
+    def window_rows(self, start=None, end=None) -> Union[slice, np.ndarray]:
+        """
+        Row positions of the messages dated in [start, end), found by binary search.
+
+        Args:
+            start: First date included (unbounded when None)
+            end: First date excluded (unbounded when None)
+
+        Returns:
+            A slice when the DataFrame is sorted by date, otherwise the sorted row positions
+        """
+        dates = self.sorted_dates
+        tz = getattr(self.df['date'].dtype, 'tz', None)
+        low = 0 if start is None else int(np.searchsorted(dates, self._as_datetime64(start, tz), side='left'))
+        high = len(dates) if end is None else int(np.searchsorted(dates, self._as_datetime64(end, tz), side='left'))
+        high = max(low, high)
+        if self.get('is_date_sorted', lambda df: bool(df['date'].is_monotonic_increasing)):
+            return slice(low, high)
+        return np.sort(self.date_order[low:high])
+
+    @staticmethod
+    def _as_datetime64(value, tz: Optional[Any]) -> np.datetime64:
+        """Convert a date bound to the representation used by sorted_dates"""
+        timestamp = pd.Timestamp(value)
+        if tz is not None:
+            timestamp = timestamp.tz_localize(tz) if timestamp.tzinfo is None else timestamp.tz_convert(tz)
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        elif timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_localize(None)
+        return timestamp.to_datetime64().astype('datetime64[ns]')
+
+    @property
+    def gaps(self) -> pd.Series:
+        """Seconds since the previous message in date order, aligned to the DataFrame rows"""
+        def compute(df):
+            order = self.date_order
+            gaps = np.empty(len(df))
+            gaps[order] = df['date'].iloc[order].diff().dt.total_seconds().to_numpy()
+            return pd.Series(gaps, index=df.index)
+        return self.get('gaps', compute)
+
+    # Aggregates
+
+    @property
+    def activity_cube(self) -> ActivityCube:
+        """Day x hour x user message counts with prefix sums"""
+        return self.get('activity_cube', lambda df: ActivityCube.from_frame(df, hour=self.hour))
+
+    @property
+    def reply_graph(self) -> ReplyGraph:
+        """Threads formed by the explicit replies"""
+        return self.get('reply_graph', lambda df: ReplyGraph(df, order=self.date_order))
+
+    @property
+    def daily_counts(self) -> pd.Series:
+        """Messages per calendar day, for days with messages"""
+        def compute(df):
+            daily = self.activity_cube.daily()
+            daily = daily[daily > 0]
+            daily.index = daily.index.date
+            return daily
+        return self.get('daily_counts', compute)
+
+    @property
+    def user_counts(self) -> pd.Series:
+        """Message count per sender, largest first, without unused categories"""
+        def compute(df):
+            counts = df['from'].value_counts()
+            return counts[counts > 0]
+        return self.get('user_counts', compute)
+
+    @property
+    def user_table(self) -> pd.DataFrame:
+        """Per-sender aggregates, see ChatAnalyzer.get_user_table()"""
+        return self.get('user_table', self._compute_user_table)
+
+    @property
+    def user_hours(self) -> pd.DataFrame:
+        """Hourly message counts per sender, indexed like user_table"""
+        def compute(df):
+            counts = pd.DataFrame({'from': df['from'], 'hour': self.hour}).groupby(
+                'from', sort=False, observed=True)['hour'].value_counts()
+            return counts.unstack(fill_value=0).reindex(
+                index=self.user_table.index, columns=range(24), fill_value=0)
+        return self.get('user_hours', compute)
+
+    def _compute_user_table(self, df: pd.DataFrame) -> pd.DataFrame:
+        sentiment = df['sentiment'] if 'sentiment' in df.columns else pd.Series(0.0, index=df.index)
+        care = df['care_mentions'] if 'care_mentions' in df.columns else pd.Series(False, index=df.index)
+        frame = pd.DataFrame({
+            'from': df['from'],
+            'date': df['date'],
+            'hour': self.hour,
+            'has_media': self.has_media,
+            'text_length': self.text_length,
+            'sentiment': sentiment,
+            'care': care,
+        })
+
+        # Senders are kept in order of first appearance; messages without a sender are left out
+        return frame.groupby('from', sort=False, observed=True).agg(
+            message_count=('date', 'size'),
+            media_count=('has_media', 'sum'),
+            first_date=('date', 'min'),
+            last_date=('date', 'max'),
+            avg_length=('text_length', 'mean'),
+            length_std=('text_length', 'std'),
+            avg_sentiment=('sentiment', 'mean'),
+            sentiment_std=('sentiment', 'std'),
+            care_rate=('care', 'mean'),
+            avg_hour=('hour', 'mean'),
+            hour_std=('hour', 'std'),
+        )
@@ -0,0 +1,149 @@
+"""
+Columnar on-disk cache of processed message DataFrames.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+from typing import Dict, Optional
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+# Schema metadata key holding the cached chat information
+_METADATA_KEY = b'telegram_analyzer'
+
+
+class FrameCache:
+    """
+    Stores processed DataFrames as uncompressed Arrow IPC files.
+
+    Uncompressed IPC files can be memory mapped, so loading a cached frame
+    costs little more than converting the columns back to pandas.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the frame cache.
+
+        Args:
+            cache_dir: Root cache directory; frames are kept in its 'frames' folder
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = os.path.join(cache_dir, 'frames')
+
+    @property
+    def available(self) -> bool:
+        """Whether pyarrow is installed"""
+        return pa is not None
+
+    @staticmethod
+    def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+        """
+        Hash a file's contents without loading it into memory.
+
+        Args:
+            path: File to hash
+            chunk_size: Number of bytes read at a time
+
+        Returns:
+            Hex digest of the file contents
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.arrow')
+
+    def load_metadata(self, key: str) -> Optional[Dict]:
+        """
+        Read only the metadata stored with a cached frame.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Metadata dictionary, or None if the frame is not cached
+        """
+        path = self._path_for(key)
+        if not self.available or not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, 'r') as source:
+                schema = pa.ipc.open_file(source).schema
+            return json.loads(schema.metadata[_METADATA_KEY])
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached frame through a memory map.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached DataFrame, or None if the frame is not cached
+        """
+        path = self._path_for(key)
+        if not self.available or not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+                # pandas gets list columns (emojis) back as numpy arrays; keep them as lists
+                lists = {field.name: table.column(field.name).to_pylist()
+                         for field in table.schema
+                         if pa.types.is_list(field.type) or pa.types.is_large_list(field.type)}
+                # Convert while the file is still mapped, releasing each Arrow column once converted
+                df = table.to_pandas(split_blocks=True, self_destruct=True)
+                del table
+            for name, values in lists.items():
+                df[name] = pd.Series(values, index=df.index, dtype=object)
+            self.logger.info(f"Loaded {len(df)} cached messages from {path}")
+            return df
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+
+    def store(self, key: str, df: pd.DataFrame, metadata: Dict) -> bool:
+        """
+        Write a frame and its metadata to the cache.
+
+        Args:
+            key: Cache key
+            df: Processed DataFrame
+            metadata: JSON-serializable metadata kept with the frame
+
+        Returns:
+            True if the frame was written
+        """
+        if not self.available:
+            return False
+        path = self._path_for(key)
+        tmp_path = f'{path}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            schema_metadata = dict(table.schema.metadata or {})
+            schema_metadata[_METADATA_KEY] = json.dumps(metadata, default=str).encode('utf-8')
+            table = table.replace_schema_metadata(schema_metadata)
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            # Atomic rename so readers never see a partially written file
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Could not cache processed messages: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
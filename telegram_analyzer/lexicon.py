@@ -0,0 +1,94 @@
+"""
+Keyword lexicons and a single-pass multi-category matcher.
+"""
+
+import re
+import pandas as pd
+from typing import Dict, Iterable, Set
+
+# Expanded medical lexicon
+HEALTH_TERMS = (
+    'sick', 'pain', 'doctor', 'medicine', 'exercise', 'sleep', 'hospital', 'fever', 'cold', 'workout', 'diet',
+    'gym', 'wellness', 'ill', 'ache', 'clinic', 'therapy', 'headache', 'nausea', 'fatigue', 'cough', 'dizzy',
+    'blood pressure', 'diabetes', 'asthma', 'anxiety', 'depression', 'insomnia', 'surgery', 'emergency',
+    'ambulance', 'rehab', 'symptom', 'prescription', 'meds', 'dose', 'vaccine', 'allergy', 'injury', 'fracture',
+    'sprain', 'covid', 'flu', 'virus', 'infection', 'biopsy', 'scan', 'xray', 'mri', 'consultation',
+    'specialist', 'pharmacy',
+)
+
+CARE_TERMS = (
+    'love', 'care', 'miss', 'hug', 'kiss', 'dear', 'sweet', 'heart', 'help', 'support', 'honey', 'darling',
+    'adore', 'cherish', 'grateful', 'appreciate', 'respect', 'kind', 'stay strong', 'take care', 'get well',
+    'healing', 'praying', 'thinking of you', 'here for you', 'comfort', 'sympathy', 'empathy', 'solidarity',
+)
+
+# Health sub-categories used for health issue tracking
+ACUTE_TERMS = ('fever', 'cold', 'flu', 'cough', 'emergency', 'ambulance', 'surgery', 'pain', 'headache')
+CHRONIC_TERMS = ('diabetes', 'asthma', 'anxiety', 'depression', 'blood pressure', 'therapy', 'meds')
+
+DEFAULT_CATEGORIES = {
+    'health': HEALTH_TERMS,
+    'care': CARE_TERMS,
+    'acute': ACUTE_TERMS,
+    'chronic': CHRONIC_TERMS,
+}
+
+
+class LexiconMatcher:
+    """
+    Matches several keyword categories with one combined regex.
+
+    Every term from every category goes into a single alternation, so each
+    text is scanned once no matter how many categories are defined. Matched
+    terms are mapped back to the categories that contain them.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]] = None):
+        """
+        Initialize the matcher.
+
+        Args:
+            categories: Mapping of category name to its keywords (case-insensitive)
+        """
+        categories = DEFAULT_CATEGORIES if categories is None else categories
+        self.categories = list(categories)
+        self.term_categories = {}
+        for category, terms in categories.items():
+            for term in terms:
+                self.term_categories.setdefault(term.lower(), set()).add(category)
+
+        # Longest terms first so multi-word phrases win over their prefixes
+        alternation = '|'.join(re.escape(term) for term in sorted(self.term_categories, key=len, reverse=True))
+        self.pattern = re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE)
+
+    def match(self, text: str) -> Set[str]:
+        """
+        Find the categories mentioned in a single text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of matched category names
+        """
+        found = set()
+        for term in self.pattern.findall(text or ''):
+            found |= self.term_categories[term.lower()]
+        return found
+
+    def flag_frame(self, texts: pd.Series) -> pd.DataFrame:
+        """
+        Flag every category for a whole column of texts in one pass.
+
+        Args:
+            texts: Series of message texts
+
+        Returns:
+            DataFrame with one boolean column per category, aligned to ``texts``
+        """
+        terms = texts.str.findall(self.pattern).explode().dropna().str.lower()
+        flags = {}
+        for category in self.categories:
+            category_terms = [term for term, cats in self.term_categories.items() if category in cats]
+            flags[category] = texts.index.isin(terms.index[terms.isin(category_terms)])
+        return pd.DataFrame(flags, index=texts.index)
@@ -7,7 +7,11 @@ import argparse
 import logging
 from telegram_analyzer.utils import setup_logging, download_nltk_data
 from telegram_analyzer.parser import TelegramDataParser
+from telegram_analyzer.batch import BatchIngestor
+from telegram_analyzer.schema import memory_report, format_memory_report
+from telegram_analyzer.streaming import MESSAGES_PATH
 from telegram_analyzer.analyzer import ChatAnalyzer
+from telegram_analyzer.activity_cube import ACTIVITY_CUBE_FILE
 from telegram_analyzer.visualizer import Visualizer
 from telegram_analyzer.report import ReportGenerator
 from telegram_analyzer.stats_export import export_stats_to_json
@@ -16,7 +20,8 @@ from telegram_analyzer.online_presence_analyzer import OnlinePresenceAnalyzer
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description='Telegram Chat Analyzer')
-    parser.add_argument('input_file', nargs='?', help='Path to Telegram export JSON file')
+    parser.add_argument('input_file', nargs='*',
+                        help='Telegram export JSON file(s); account exports and combined exports may hold many chats')
     parser.add_argument('--output-dir', default='analysis_output', help='Output directory for analysis results')
     parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                         help='Set the logging level')
@@ -31,6 +36,27 @@ def parse_arguments():
     parser.add_argument('--user-db', default='users.json', help='Path to user database file')
     parser.add_argument('--no-auth', action='store_true', help='Disable authentication for web server')
     
+    # Parsing arguments
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the export instead of loading it into memory (for very large files)')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='Number of messages processed per batch')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for sentiment scoring (0 uses all CPUs)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Worker processes parsing chats when there are several (0 uses all CPUs)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory for caches reused across runs (sentiment scores, processed messages)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only process messages newer than those already stored in --cache-dir')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Log memory used by the processed messages compared with the legacy layout')
+    
+    # Analysis arguments
+    parser.add_argument('--approximate', type=float, default=None, metavar='FRACTION',
+                        help='Write statistics estimated from a sample of this fraction of the messages first, '
+                             'then replace them with the exact ones computed afterwards')
+    
     # Online presence analysis arguments
     parser.add_argument('--skip-online-presence', action='store_true', help='Skip online presence analysis')
     
@@ -66,7 +92,7 @@ def main():
     # Check if input file was provided
     if not args.input_file:
         logger.error("No input file provided. Use --serve to start the web server or provide an input file.")
-        print("Usage: telegram-analyzer path/to/file.json [options]")
+        print("Usage: telegram-analyzer path/to/file.json [more.json ...] [options]")
         print("       telegram-analyzer --serve [options]")
         return 1
     
@@ -83,13 +109,27 @@ def main():
 
         # Process messages
         logger.info("Processing messages...")
-        data_parser = TelegramDataParser(args.input_file)
-        messages_df = data_parser.process_messages()
+        if len(args.input_file) == 1 and BatchIngestor().detect_layout(args.input_file[0]) == MESSAGES_PATH:
+            data_parser = TelegramDataParser(args.input_file[0], streaming=args.stream, batch_size=args.batch_size,
+                                             sentiment_workers=args.workers or None, cache_dir=args.cache_dir,
+                                             report_memory=args.memory_report, incremental=args.incremental)
+            messages_df = data_parser.process_messages()
+        else:
+            ingestor = BatchIngestor(workers=args.parse_workers or None, streaming=args.stream,
+                                     batch_size=args.batch_size, sentiment_workers=args.workers or None,
+                                     cache_dir=args.cache_dir, incremental=args.incremental)
+            messages_df = ingestor.process(args.input_file)
+            if args.memory_report:
+                logger.info("Processed message memory usage:\n" + format_memory_report(memory_report(messages_df)))
         logger.info(f"Processed {len(messages_df)} messages")
 
         # Analyze chat
         logger.info("Analyzing chat...")
         analyzer = ChatAnalyzer(messages_df)
+        if args.approximate:
+            # Write the approximate statistics before starting the exact run, which would slow them down
+            export_stats_to_json(analyzer.get_approximate_stats(fraction=args.approximate), args.output_dir)
+            logger.info("Approximate statistics written; computing the exact ones...")
         analysis_results = analyzer.get_all_stats()
         
         # Run online presence analysis
@@ -99,7 +139,7 @@ def main():
             os.makedirs(online_presence_dir, exist_ok=True)
             
             try:
-                online_analyzer = OnlinePresenceAnalyzer(messages_df, online_presence_dir)
+                online_analyzer = OnlinePresenceAnalyzer(messages_df, online_presence_dir, analyzer=analyzer)
                 online_report_path = online_analyzer.generate_online_presence_report()
                 online_presence_stats = online_analyzer.get_online_time_stats()
                 
@@ -111,12 +151,14 @@ def main():
             except Exception as e:
                 logger.error(f"Error in online presence analysis: {str(e)}", exc_info=True)
         
-        # Export statistics to JSON for web server
+        # Export statistics and the activity cube for web server
         export_stats_to_json(analysis_results, args.output_dir)
+        analyzer.features.activity_cube.save(os.path.join(args.output_dir, ACTIVITY_CUBE_FILE))
 
         # Generate standard visualizations
         logger.info("Generating visualizations...")
-        visualizer = Visualizer(messages_df, args.output_dir)
+        visualizer = Visualizer(messages_df, args.output_dir, activity_cube=analyzer.features.activity_cube,
+                                reply_graph=analyzer.get_reply_graph())
         generated_viz = visualizer.generate_all_visualizations()
         logger.info(f"Generated {len(generated_viz)} static visualizations: {', '.join(generated_viz)}")
         
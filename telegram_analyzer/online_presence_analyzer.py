@@ -11,60 +11,151 @@ import os
 import logging
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from .reply_graph import ReplyGraph
+from .activity_cube import ActivityCube, WEEKDAYS
+from .analyzer import ChatAnalyzer
+
+# Minutes within which a message counts as a response, and window of the latency statistics
+RESPONSE_WINDOW_MINUTES = 60
+LATENCY_WINDOW_MINUTES = 120
+
+# Response network: gap of implicit responses, responses needed for an edge, users drawn
+NETWORK_GAP_MINUTES = 30
+NETWORK_MIN_RESPONSES = 3
+NETWORK_MAX_USERS = 30
+
+# Gaps between a user's messages counted as absences, and absences reported as long
+ABSENCE_MIN_DAYS = 3
+LONG_ABSENCE_DAYS = 7
+
+# Default time periods: name -> (first hour, last hour), both inclusive; ranges may wrap past midnight
+DEFAULT_TIME_PERIODS = {
+    'morning': (5, 11),    # 5 AM - 11:59 AM
+    'afternoon': (12, 16), # 12 PM - 4:59 PM
+    'evening': (17, 21),   # 5 PM - 9:59 PM
+    'night': (22, 4)       # 10 PM - 4:59 AM
+}
 
 class OnlinePresenceAnalyzer:
     """Analyzer for user online presence, activity patterns, and interaction behaviors"""
     
-    def __init__(self, messages_df: pd.DataFrame, output_dir: str):
+    def __init__(self, messages_df: pd.DataFrame, output_dir: str, analyzer: Optional[ChatAnalyzer] = None,
+                 time_periods: Optional[Dict[str, Tuple[int, int]]] = None):
         """
         Initialize the online presence analyzer.
         
+        The messages are not copied: the analyzer keeps a narrow frame of the
+        sender, date and a few compact derived columns, in date order.
+        
         Args:
             messages_df: DataFrame containing message data with 'from' and 'date' columns
             output_dir: Directory to save output files and visualizations
+            analyzer: ChatAnalyzer of the same messages, whose date order, hour
+                features and activity cube are reused instead of recomputed
+            time_periods: Periods of the day as name -> (first hour, last hour), both
+                inclusive and possibly wrapping past midnight; together they must cover
+                every hour exactly once (defaults to DEFAULT_TIME_PERIODS)
         """
         self.logger = logging.getLogger(__name__)
-        self.messages_df = messages_df.copy()
         self.output_dir = output_dir
         
         # Validate required columns
         required_columns = ['from', 'date']
         for column in required_columns:
-            if column not in self.messages_df.columns:
+            if column not in messages_df.columns:
                 self.logger.error(f"Required column '{column}' not found in messages DataFrame")
                 raise ValueError(f"Required column '{column}' not found in messages DataFrame")
         
-        # Ensure date column is datetime type
-        if not pd.api.types.is_datetime64_any_dtype(self.messages_df['date']):
+        if not pd.api.types.is_datetime64_any_dtype(messages_df['date']):
             self.logger.warning("Converting 'date' column to datetime")
-            self.messages_df['date'] = pd.to_datetime(self.messages_df['date'])
-        
-        # Filter out any rows with None in the 'from' column
-        self.messages_df = self.messages_df[self.messages_df['from'].notna()].reset_index(drop=True)
+            messages_df = messages_df.assign(date=pd.to_datetime(messages_df['date']))
+        dates = messages_df['date']
+        
+        # Messages with a sender, in date order
+        shared = analyzer is not None and analyzer.df is messages_df
+        if shared:
+            order = analyzer.features.date_order
+            hours = analyzer.features.hour.to_numpy()
+            self._reply_graph = analyzer.get_reply_graph()
+        else:
+            order = np.argsort(dates.to_numpy(), kind='stable')
+            hours = None
+            self._reply_graph = None
+        rows = order[messages_df['from'].notna().to_numpy()[order]]
+        # The chat's activity cube counts the same messages only when they all have a sender
+        self._activity_cube = (analyzer.features.activity_cube
+                               if shared and len(rows) == len(messages_df) else None)
+        self._source_df = messages_df
+        self._order = order
+        self._rows = rows
+        
+        dates = dates.iloc[rows].reset_index(drop=True)
+        self.messages_df = pd.DataFrame({
+            'from': messages_df['from'].iloc[rows].reset_index(drop=True),
+            'date': dates,
+        })
         
         # Extract key time features
-        self.messages_df['hour'] = self.messages_df['date'].dt.hour
-        self.messages_df['day_of_week'] = self.messages_df['date'].dt.day_name()
-        self.messages_df['day'] = self.messages_df['date'].dt.date
-        
-        # Define time periods for analysis
-        self.time_periods = {
-            'morning': (5, 11),    # 5 AM - 11:59 AM
-            'afternoon': (12, 16), # 12 PM - 4:59 PM
-            'evening': (17, 21),   # 5 PM - 9:59 PM
-            'night': (22, 4)       # 10 PM - 4:59 AM
-        }
+        self.messages_df['hour'] = (dates.dt.hour.to_numpy() if hours is None else hours[rows]).astype(np.int8)
+        self.messages_df['day_of_week'] = pd.Categorical.from_codes(
+            dates.dt.dayofweek.to_numpy(), WEEKDAYS).remove_unused_categories()
+        self.messages_df['day'] = dates.dt.normalize()
+        
+        # Define time periods for analysis, with the period index of every hour
+        self.time_periods = dict(time_periods or DEFAULT_TIME_PERIODS)
+        self._period_of_hour = self._build_period_lookup(self.time_periods)
+        self._period_distribution = None
+        self._response_table = None
+        self._activity_table = None
         
         # Create time period column
-        self.messages_df['time_period'] = self.messages_df['hour'].apply(self._get_time_period)
+        self.messages_df['time_period'] = pd.Categorical.from_codes(
+            self._period_of_hour[self.messages_df['hour'].to_numpy()], list(self.time_periods))
         
         # Create previous and next message columns for response analysis
         self._prepare_conversation_data()
 
+    @property
+    def activity_cube(self) -> ActivityCube:
+        """
+        Day x hour message counts of the analyzed messages, for the chat-wide
+        day and hour patterns. Per-user patterns are counted from the messages,
+        since the cube only gives the most active senders their own slot.
+        """
+        if self._activity_cube is None:
+            self._activity_cube = ActivityCube.from_frame(self.messages_df, top_users=0,
+                                                          hour=self.messages_df['hour'])
+        return self._activity_cube
+
+    @staticmethod
+    def _build_period_lookup(time_periods: Dict[str, Tuple[int, int]]) -> np.ndarray:
+        """
+        Map every hour of the day to the index of its time period.
+        
+        Args:
+            time_periods: Periods as name -> (first hour, last hour), both inclusive
+            
+        Returns:
+            Array of 24 period indexes, in the order of ``time_periods``
+        """
+        lookup = np.full(24, -1, dtype=np.int8)
+        for index, (name, (first, last)) in enumerate(time_periods.items()):
+            if not (0 <= first <= 23 and 0 <= last <= 23):
+                raise ValueError(f"Hours of time period '{name}' must be between 0 and 23")
+            hours = np.arange(first, last + 1) if first <= last else np.r_[first:24, 0:last + 1]
+            overlapping = hours[lookup[hours] >= 0]
+            if len(overlapping):
+                raise ValueError(f"Time period '{name}' overlaps another period at hour(s) {overlapping.tolist()}")
+            lookup[hours] = index
+        
+        uncovered = np.flatnonzero(lookup < 0)
+        if len(uncovered):
+            raise ValueError(f"Time periods do not cover hour(s) {uncovered.tolist()}")
+        return lookup
+
     def _get_time_period(self, hour: int) -> str:
         """
-        Determine time period (morning, afternoon, evening, night) for a given hour.
+        Determine the time period (e.g. morning, afternoon, evening, night) of a given hour.
         
         Args:
             hour: Hour of day (0-23)
@@ -72,42 +163,94 @@ class OnlinePresenceAnalyzer:
         Returns:
             String representing the time period
         """
-        if 5 <= hour <= 11:
-            return 'morning'
-        elif 12 <= hour <= 16:
-            return 'afternoon'
-        elif 17 <= hour <= 21:
-            return 'evening'
-        else:  # 22-23, 0-4
-            return 'night'
-    
-    def _prepare_conversation_data(self):
-        """Prepare data for conversation and response analysis"""
-        # Sort by date
-        sorted_df = self.messages_df.sort_values('date').reset_index(drop=True)
-        
-        # Create columns for previous and next message info
-        sorted_df['prev_message_time'] = sorted_df['date'].shift(1)
-        sorted_df['prev_message_user'] = sorted_df['from'].shift(1)
-        sorted_df['next_message_time'] = sorted_df['date'].shift(-1)
-        sorted_df['next_message_user'] = sorted_df['from'].shift(-1)
+        return list(self.time_periods)[self._period_of_hour[hour]]
+
+    @staticmethod
+    def _format_hour(hour: int) -> str:
+        """Format an hour of day as '5 AM' or '12 PM'"""
+        return f"{(hour % 12) or 12} {'AM' if hour % 24 < 12 else 'PM'}"
+
+    def _time_period_labels(self) -> Dict[str, str]:
+        """Display label of every time period, e.g. 'Morning (5 AM - 12 PM)'"""
+        return {
+            name: f"{name.title()} ({self._format_hour(first)} - {self._format_hour(last + 1)})"
+            for name, (first, last) in self.time_periods.items()
+        }
+
+    def get_period_distribution(self) -> pd.DataFrame:
+        """
+        Messages of every user in every time period.
         
-        # Calculate time between messages
-        sorted_df['time_since_prev'] = (sorted_df['date'] - sorted_df['prev_message_time']).dt.total_seconds() / 60
-        sorted_df['time_until_next'] = (sorted_df['next_message_time'] - sorted_df['date']).dt.total_seconds() / 60
+        Returns:
+            DataFrame indexed by user, in order of first message, with one column per
+            time period in configuration order
+        """
+        if self._period_distribution is None:
+            distribution = pd.crosstab(self.messages_df['from'], self.messages_df['time_period'])
+            self._period_distribution = distribution.reindex(
+                index=self.messages_df['from'].unique(), columns=list(self.time_periods), fill_value=0)
+        return self._period_distribution
+
+    def _prepare_conversation_data(self):
+        """Prepare data for conversation and response analysis (messages are already in date order)"""
+        df = self.messages_df
+        senders = df['from']
+        previous_user = senders.shift(1)
+        next_user = senders.shift(-1)
+        
+        # Minutes between consecutive messages
+        gaps = np.diff(df['date'].to_numpy(dtype='datetime64[ns]')).astype(np.float64) / 6e10
+        time_since_prev = np.full(len(df), np.nan, dtype=np.float32)
+        time_until_next = np.full(len(df), np.nan, dtype=np.float32)
+        time_since_prev[1:] = gaps
+        time_until_next[:-1] = gaps
+        df['time_since_prev'] = time_since_prev
+        df['time_until_next'] = time_until_next
+        df['next_message_user'] = next_user
         
         # Flag if message is a response (different user from previous message)
-        sorted_df['is_response'] = sorted_df['from'] != sorted_df['prev_message_user']
+        df['is_response'] = (senders != previous_user).to_numpy()
         
         # Flag if message received a response (different user for next message)
-        sorted_df['got_response'] = sorted_df['from'] != sorted_df['next_message_user']
+        df['got_response'] = (senders != next_user).to_numpy()
+    
+    def _response_targets(self, max_gap_seconds: Optional[float] = None) -> np.ndarray:
+        """
+        Message each message answers, see ReplyGraph.response_targets().
         
-        # Flag quick responses (within 5 minutes)
-        sorted_df['quick_response'] = (sorted_df['is_response'] & (sorted_df['time_since_prev'] <= 5))
+        Args:
+            max_gap_seconds: Maximum time to the previous message for an implicit answer
         
-        # Update our main dataframe
-        self.messages_df = sorted_df
-    
+        Returns:
+            Row position in self.messages_df of the answered message (-1 when none)
+        """
+        if self._reply_graph is None:
+            self._reply_graph = ReplyGraph(self._source_df, order=self._order)
+        
+        eligible = np.zeros(len(self._source_df), dtype=bool)
+        eligible[self._rows] = True
+        targets = self._reply_graph.response_targets(eligible, max_gap_seconds)[self._rows]
+        local = np.full(len(self._source_df), -1, dtype=np.int64)
+        local[self._rows] = np.arange(len(self._rows))
+        return np.where(targets >= 0, local[targets], -1)
+
+    def get_activity_table(self) -> pd.DataFrame:
+        """
+        Activity of every user, computed in one grouped pass.
+        
+        Returns:
+            DataFrame indexed by user, in order of first message, with 'messages',
+            'active_days' (calendar days with a message) and 'hour_variance'
+            (variance of the hours of day of the user's messages)
+        """
+        if self._activity_table is None:
+            self._activity_table = self.messages_df.groupby('from', sort=False, observed=True).agg(
+                messages=('hour', 'size'),
+                active_days=('day', 'nunique'),
+                hour_variance=('hour', 'var'),
+            )
+        return self._activity_table
+
     def get_online_time_stats(self) -> Dict:
         """
         Get comprehensive online time statistics for users.
@@ -117,28 +260,24 @@ class OnlinePresenceAnalyzer:
         """
         stats = {}
         
-        # Calculate active days per user
-        user_active_days = {}
-        for user in self.messages_df['from'].unique():
-            user_days = self.messages_df[self.messages_df['from'] == user]['day'].nunique()
-            user_active_days[user] = user_days
-        
         # Most and least active users by days
-        most_active_user = max(user_active_days.items(), key=lambda x: x[1])
-        least_active_user = min(user_active_days.items(), key=lambda x: x[1])
+        active_days = self.get_activity_table()['active_days']
+        most_active_user = active_days.idxmax()
+        least_active_user = active_days.idxmin()
         
         stats['most_active_user_days'] = {
-            'user': most_active_user[0],
-            'active_days': most_active_user[1]
+            'user': most_active_user,
+            'active_days': int(active_days[most_active_user])
         }
         
         stats['least_active_user_days'] = {
-            'user': least_active_user[0],
-            'active_days': least_active_user[1]
+            'user': least_active_user,
+            'active_days': int(active_days[least_active_user])
         }
         
         # Daily activity patterns
-        day_counts = self.messages_df['day_of_week'].value_counts()
+        day_counts = self.activity_cube.weekday_totals()
+        day_counts = day_counts[day_counts > 0]
         most_active_day = day_counts.idxmax()
         least_active_day = day_counts.idxmin()
         
@@ -146,24 +285,16 @@ class OnlinePresenceAnalyzer:
         stats['least_active_day'] = least_active_day
         
         # Time period preference by user
-        user_time_periods = {}
-        for user in self.messages_df['from'].unique():
-            user_data = self.messages_df[self.messages_df['from'] == user]
-            period_counts = user_data['time_period'].value_counts()
-            preferred_period = period_counts.idxmax() if not period_counts.empty else None
-            user_time_periods[user] = preferred_period
-        
-        stats['user_preferred_periods'] = user_time_periods
-        
-        # Identify early birds (most active in the morning)
-        morning_users = self.messages_df[self.messages_df['time_period'] == 'morning']['from'].value_counts()
-        early_birds = morning_users.nlargest(3).index.tolist()
-        stats['early_birds'] = early_birds
+        distribution = self.get_period_distribution()
+        stats['user_preferred_periods'] = distribution.idxmax(axis=1).to_dict() if not distribution.empty else {}
         
-        # Identify night owls (most active at night)
-        night_users = self.messages_df[self.messages_df['time_period'] == 'night']['from'].value_counts()
-        night_owls = night_users.nlargest(3).index.tolist()
-        stats['night_owls'] = night_owls
+        # Identify early birds (most active in the morning) and night owls (most active at night)
+        for key, period in (('early_birds', 'morning'), ('night_owls', 'night')):
+            if period in distribution.columns:
+                counts = distribution[period]
+                stats[key] = counts[counts > 0].nlargest(3).index.tolist()
+            else:
+                stats[key] = []
         
         # Response patterns
         response_stats = self._get_response_stats()
@@ -219,12 +350,7 @@ class OnlinePresenceAnalyzer:
         """Create HTML content for the online presence report"""
         
         # Format time periods for display
-        time_period_labels = {
-            'morning': 'Morning (5 AM - 12 PM)',
-            'afternoon': 'Afternoon (12 PM - 5 PM)',
-            'evening': 'Evening (5 PM - 10 PM)',
-            'night': 'Night (10 PM - 5 AM)'
-        }
+        time_period_labels = self._time_period_labels()
         
         html = f"""
         <!DOCTYPE html>
@@ -444,7 +570,7 @@ class OnlinePresenceAnalyzer:
                                         <div class="row">
             """
             
-            for period in ['morning', 'afternoon', 'evening', 'night']:
+            for period in self.time_periods:
                 users = [user for user, pref in stats['user_preferred_periods'].items() if pref == period]
                 if users:
                     html += f"""
@@ -725,6 +851,98 @@ class OnlinePresenceAnalyzer:
         
         return html
     
+    def get_response_latencies(self, max_minutes: float = LATENCY_WINDOW_MINUTES) -> pd.DataFrame:
+        """
+        Latency of every response, for distributions and charts.
+        
+        A response is a message following a message from another user.
+        
+        Args:
+            max_minutes: Longest latency kept, to leave out conversations resumed after a break
+        
+        Returns:
+            DataFrame with 'from' (the responding user) and 'latency' in minutes
+        """
+        df = self.messages_df
+        mask = (df['is_response'] & (df['time_since_prev'] <= max_minutes)).to_numpy()
+        return pd.DataFrame({'from': df['from'][mask], 'latency': df['time_since_prev'][mask]}).reset_index(drop=True)
+
+    def get_response_edges(self, max_gap_minutes: float = NETWORK_GAP_MINUTES) -> pd.DataFrame:
+        """
+        Who responds to whom, counted in one grouped pass.
+
+        A message responds to the message it explicitly replies to, otherwise
+        to the previous message when it came within ``max_gap_minutes``.
+
+        Args:
+            max_gap_minutes: Maximum time to the previous message for an implicit response
+
+        Returns:
+            DataFrame with 'responder', 'target' and 'count', most frequent pairs first
+        """
+        targets = self._response_targets(max_gap_seconds=max_gap_minutes * 60)
+        positions = np.flatnonzero(targets >= 0)
+        senders = self.messages_df['from'].to_numpy(dtype=object)
+        pairs = pd.DataFrame({'responder': senders[positions], 'target': senders[targets[positions]]})
+        pairs = pairs[pairs['responder'] != pairs['target']]
+        edges = pairs.groupby(['responder', 'target'], sort=False).size().rename('count').reset_index()
+        return edges.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    def get_response_table(self) -> pd.DataFrame:
+        """
+        Response behaviour of every user, computed in one grouped pass.
+        
+        Every quantity is attributed to the responding user's own messages: a
+        message following another user's message answers a prompt, and it
+        counts as a response when it comes within RESPONSE_WINDOW_MINUTES.
+        
+        Returns:
+            DataFrame indexed by user, in order of first message, with 'messages',
+            'prompts' (messages of others followed by the user), 'responses',
+            'response_rate', 'avg_response_time' and 'median_response_time' in
+            minutes, 'got_responses' and 'got_response_rate' (share of the user's
+            messages followed by someone else), and 'latency_count' and
+            'latency_p50'/'latency_p90'/'latency_p99' of the user's responses
+            within LATENCY_WINDOW_MINUTES
+        """
+        if self._response_table is not None:
+            return self._response_table
+        
+        df = self.messages_df
+        gap = df['time_since_prev']
+        prompted = df['is_response'] & gap.notna()
+        answered = prompted & (gap <= RESPONSE_WINDOW_MINUTES)
+        frame = pd.DataFrame({
+            'from': df['from'],
+            'prompted': prompted,
+            'answered': answered,
+            'answer_time': gap.where(answered),
+            'got_response': df['got_response'],
+            'latency': gap.where(df['is_response'] & (gap <= LATENCY_WINDOW_MINUTES)),
+        })
+        
+        grouped = frame.groupby('from', sort=False, observed=True)
+        table = grouped.agg(
+            messages=('got_response', 'size'),
+            prompts=('prompted', 'sum'),
+            responses=('answered', 'sum'),
+            avg_response_time=('answer_time', 'mean'),
+            median_response_time=('answer_time', 'median'),
+            got_responses=('got_response', 'sum'),
+            latency_count=('latency', 'count'),
+        )
+        percentiles = grouped['latency'].quantile([0.5, 0.9, 0.99]).unstack()
+        table[['latency_p50', 'latency_p90', 'latency_p99']] = percentiles.reindex(table.index).to_numpy(dtype=np.float64)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table['response_rate'] = table['responses'] / table['prompts'].where(table['prompts'] > 0)
+            table['got_response_rate'] = table['got_responses'] / table['messages']
+        # Users who never answered within the window respond "infinitely" slowly
+        table.loc[(table['prompts'] > 0) & (table['responses'] == 0), 'avg_response_time'] = float('inf')
+        
+        self._response_table = table
+        return table
+
     def _get_response_stats(self) -> Dict:
         """
         Analyze response patterns of users.
@@ -733,30 +951,12 @@ class OnlinePresenceAnalyzer:
             Dictionary containing response pattern statistics
         """
         stats = {}
+        table = self.get_response_table()
         
-        # Calculate response rates for each user (when they are mentioned or replied to)
-        user_response_rates = {}
-        user_avg_response_times = {}
-        
-        for user in self.messages_df['from'].unique():
-            # Messages that might need a response from this user
-            messages_to_user = self.messages_df[
-                (self.messages_df['next_message_user'] == user) & 
-                (self.messages_df['from'] != user)
-            ]
-            
-            total_messages_to_user = len(messages_to_user)
-            
-            if total_messages_to_user > 0:
-                # Messages that this user responded to
-                responses = messages_to_user[messages_to_user['time_until_next'] <= 60]  # Within 60 minutes
-                response_rate = len(responses) / total_messages_to_user
-                
-                # Average response time
-                avg_response_time = responses['time_until_next'].mean() if len(responses) > 0 else float('inf')
-                
-                user_response_rates[user] = response_rate
-                user_avg_response_times[user] = avg_response_time
+        # Response rates and times of users who were prompted at least once
+        prompted = table[table['prompts'] > 0]
+        user_response_rates = prompted['response_rate'].to_dict()
+        user_avg_response_times = prompted['avg_response_time'].astype(float).to_dict()
         
         # Users with fastest and slowest response times
         if user_avg_response_times:
@@ -790,37 +990,40 @@ class OnlinePresenceAnalyzer:
                 'response_rate': least_responsive[1]
             }
         
-        # Calculate ignored users (those whose messages frequently don't get responses)
-        user_received_responses = {}
-        for user in self.messages_df['from'].unique():
-            messages_from_user = self.messages_df[self.messages_df['from'] == user]
-            total_messages = len(messages_from_user)
-            
-            if total_messages > 0:
-                received_responses = messages_from_user[messages_from_user['got_response'] == True]
-                response_rate = len(received_responses) / total_messages
-                user_received_responses[user] = response_rate
-        
-        if user_received_responses:
-            # Filter to users with at least 10 messages
-            active_users = {k: v for k, v in user_received_responses.items() 
-                           if len(self.messages_df[self.messages_df['from'] == k]) >= 10}
+        # Calculate ignored users (those whose messages frequently don't get responses),
+        # among users with at least 10 messages
+        active_users = table.loc[table['messages'] >= 10, 'got_response_rate'].to_dict()
+        
+        if active_users:
+            most_ignored = min(active_users.items(), key=lambda x: x[1])
+            stats['most_ignored_user'] = {
+                'user': most_ignored[0],
+                'got_response_rate': most_ignored[1]
+            }
             
-            if active_users:
-                most_ignored = min(active_users.items(), key=lambda x: x[1])
-                stats['most_ignored_user'] = {
-                    'user': most_ignored[0],
-                    'got_response_rate': most_ignored[1]
-                }
-                
-                most_engaging = max(active_users.items(), key=lambda x: x[1])
-                stats['most_engaging_user'] = {
-                    'user': most_engaging[0],
-                    'got_response_rate': most_engaging[1]
-                }
+            most_engaging = max(active_users.items(), key=lambda x: x[1])
+            stats['most_engaging_user'] = {
+                'user': most_engaging[0],
+                'got_response_rate': most_engaging[1]
+            }
         
         return stats
     
+    def _ghosting_table(self) -> pd.DataFrame:
+        """Ghosting inputs per user: high presence with a low response rate"""
+        table = self.get_response_table()
+        # Messages of others the user followed up on, and those answered within the response window
+        response_rate = table['response_rate'].fillna(0)
+        online_presence = table['messages'] / table['messages'].sum()
+        return pd.DataFrame({
+            'messages': table['messages'],
+            'potential_responses': table['prompts'],
+            'actual_responses': table['responses'],
+            'response_rate': response_rate,
+            'online_presence': online_presence,
+            'ghosting_score': online_presence * (1 - response_rate),
+        })
+
     def _get_consistency_stats(self) -> Dict:
         """
         Analyze consistency of user activity patterns.
@@ -830,53 +1033,74 @@ class OnlinePresenceAnalyzer:
         """
         stats = {}
         
-        # Calculate daily activity consistency
-        user_daily_consistency = {}
-        total_days = (self.messages_df['day'].max() - self.messages_df['day'].min()).days + 1
+        activity = self.get_activity_table()
         
-        for user in self.messages_df['from'].unique():
-            user_days = self.messages_df[self.messages_df['from'] == user]['day'].nunique()
-            consistency_score = user_days / total_days if total_days > 0 else 0
-            user_daily_consistency[user] = consistency_score
+        # Calculate daily activity consistency
+        total_days = self.activity_cube.n_days
+        daily_consistency = activity['active_days'] / max(total_days, 1)
         
-        if user_daily_consistency:
-            most_consistent = max(user_daily_consistency.items(), key=lambda x: x[1])
-            least_consistent = min(user_daily_consistency.items(), key=lambda x: x[1])
+        if not daily_consistency.empty:
+            most_consistent = daily_consistency.idxmax()
+            least_consistent = daily_consistency.idxmin()
             
             stats['most_consistent_user'] = {
-                'user': most_consistent[0],
-                'consistency_score': most_consistent[1]
+                'user': most_consistent,
+                'consistency_score': float(daily_consistency[most_consistent])
             }
             
             stats['least_consistent_user'] = {
-                'user': least_consistent[0],
-                'consistency_score': least_consistent[1]
+                'user': least_consistent,
+                'consistency_score': float(daily_consistency[least_consistent])
             }
         
-        # Calculate time of day consistency (variance in active hours)
-        user_hour_variance = {}
-        for user in self.messages_df['from'].unique():
-            user_hours = self.messages_df[self.messages_df['from'] == user]['hour']
-            if len(user_hours) > 5:  # Only for users with enough data
-                hour_variance = user_hours.var()
-                user_hour_variance[user] = hour_variance
-        
-        if user_hour_variance:
-            most_consistent_time = min(user_hour_variance.items(), key=lambda x: x[1])
-            least_consistent_time = max(user_hour_variance.items(), key=lambda x: x[1])
+        # Calculate time of day consistency (variance in active hours), for users with enough data
+        hour_variance = activity.loc[activity['messages'] > 5, 'hour_variance'].dropna()
+        
+        if not hour_variance.empty:
+            most_consistent_time = hour_variance.idxmin()
+            least_consistent_time = hour_variance.idxmax()
             
             stats['most_time_consistent_user'] = {
-                'user': most_consistent_time[0],
-                'hour_variance': most_consistent_time[1]
+                'user': most_consistent_time,
+                'hour_variance': float(hour_variance[most_consistent_time])
             }
             
             stats['least_time_consistent_user'] = {
-                'user': least_consistent_time[0],
-                'hour_variance': least_consistent_time[1]
+                'user': least_consistent_time,
+                'hour_variance': float(hour_variance[least_consistent_time])
             }
         
         return stats
     
+    def get_absence_gaps(self, min_days: float = ABSENCE_MIN_DAYS) -> pd.DataFrame:
+        """
+        Every gap between consecutive messages of a user longer than a threshold.
+        
+        The gaps of all users come from one grouped diff of the date-sorted
+        messages, so availability calendars of large groups are cheap to build.
+        
+        Args:
+            min_days: Gaps must be longer than this many days
+            
+        Returns:
+            DataFrame with 'from', 'start_date' (last message before the gap),
+            'end_date' (first message after it), 'duration' and whole 'days',
+            in order of end date
+        """
+        df = self.messages_df
+        previous = df.groupby('from', sort=False, observed=True)['date'].shift()
+        duration = df['date'] - previous
+        mask = (duration > pd.Timedelta(days=min_days)).to_numpy()
+        
+        gaps = pd.DataFrame({
+            'from': df['from'][mask],
+            'start_date': previous[mask],
+            'end_date': df['date'][mask],
+            'duration': duration[mask],
+        }).reset_index(drop=True)
+        gaps['days'] = gaps['duration'].dt.days
+        return gaps
+
     def _detect_user_absences(self) -> Dict:
         """
         Detect periods of absence for each user.
@@ -886,59 +1110,30 @@ class OnlinePresenceAnalyzer:
         """
         stats = {}
         
-        # Find longest absence for each user
-        user_absences = {}
-        user_longest_absence = {}
-        
-        for user in self.messages_df['from'].unique():
-            user_msgs = self.messages_df[self.messages_df['from'] == user].sort_values('date')
-            
-            if len(user_msgs) <= 1:
-                continue
-                
-            # Calculate time gaps between consecutive messages
-            date_diffs = user_msgs['date'].diff()
-            
-            # Find the longest gap
-            max_gap_idx = date_diffs.idxmax()
-            if pd.notna(max_gap_idx):
-                max_gap = date_diffs.loc[max_gap_idx]
-                
-                # Only consider gaps of more than 3 days
-                if max_gap.total_seconds() > 3 * 24 * 3600:
-                    start_date = user_msgs.iloc[max_gap_idx-1]['date'] if max_gap_idx > 0 else None
-                    end_date = user_msgs.loc[max_gap_idx, 'date']
-                    
-                    if start_date and end_date:
-                        # Fix: Ensure start_date is before end_date
-                        if start_date > end_date:
-                            start_date, end_date = end_date, start_date
-                            
-                        absence_days = (end_date - start_date).days
-                        
-                        # Fix: Ensure we have positive absence days
-                        if absence_days > 0:
-                            user_longest_absence[user] = {
-                                'start_date': start_date,
-                                'end_date': end_date,
-                                'days': absence_days
-                            }
-                            
-                            # Track absences over 7 days
-                            if absence_days >= 7:
-                                user_absences[user] = absence_days
-        
-        if user_longest_absence:
-            # Find user with longest absence
-            longest_absence_user = max(user_longest_absence.items(), key=lambda x: x[1]['days'])
-            stats['longest_absence'] = {
-                'user': longest_absence_user[0],
-                'details': longest_absence_user[1]
+        gaps = self.get_absence_gaps()
+        if gaps.empty:
+            return stats
+        
+        # Longest absence of each user (the earliest one on ties), users in order of first message
+        longest = gaps.loc[gaps.groupby('from', sort=False, observed=True)['duration'].idxmax()].set_index('from')
+        users = pd.Index(self.messages_df['from'].unique())
+        longest = longest.reindex(users.intersection(longest.index, sort=False))
+        
+        # Find user with longest absence
+        longest_absence_user = longest['days'].idxmax()
+        details = longest.loc[longest_absence_user]
+        stats['longest_absence'] = {
+            'user': longest_absence_user,
+            'details': {
+                'start_date': details['start_date'],
+                'end_date': details['end_date'],
+                'days': int(details['days'])
             }
-            
-            # Count users with significant absences
-            stats['users_with_absences'] = list(user_absences.keys())
-            stats['absence_count'] = len(user_absences)
+        }
+        
+        # Count users with significant absences
+        stats['users_with_absences'] = longest.index[longest['days'] >= LONG_ABSENCE_DAYS].tolist()
+        stats['absence_count'] = len(stats['users_with_absences'])
         
         return stats
     
@@ -952,41 +1147,19 @@ class OnlinePresenceAnalyzer:
         stats = {}
         
         # Calculate response rate and online presence for each user
-        user_stats = {}
-        
-        for user in self.messages_df['from'].unique():
-            # Messages sent by this user
-            user_messages = len(self.messages_df[self.messages_df['from'] == user])
-            
-            # Messages this user could have responded to
-            potential_responses = len(self.messages_df[
-                (self.messages_df['next_message_user'] == user) & 
-                (self.messages_df['from'] != user) &
-                (self.messages_df['time_until_next'] <= 60)  # Within 60 minutes
-            ])
-            
-            # Messages from others that this user actually responded to
-            actual_responses = len(self.messages_df[
-                (self.messages_df['from'] == user) & 
-                (self.messages_df['is_response'] == True) &
-                (self.messages_df['time_since_prev'] <= 60)  # Within 60 minutes
-            ])
-            
-            response_rate = actual_responses / potential_responses if potential_responses > 0 else 0
-            online_presence = user_messages / self.messages_df['from'].value_counts().sum()
-            
-            # Calculate ghosting score: high presence, low response
-            if user_messages >= 10 and potential_responses >= 5:
-                ghosting_score = online_presence * (1 - response_rate)
-                
-                user_stats[user] = {
-                    'messages': user_messages,
-                    'potential_responses': potential_responses,
-                    'actual_responses': actual_responses,
-                    'response_rate': response_rate,
-                    'online_presence': online_presence,
-                    'ghosting_score': ghosting_score
-                }
+        ghosting = self._ghosting_table()
+        ghosting = ghosting[(ghosting['messages'] >= 10) & (ghosting['potential_responses'] >= 5)]
+        user_stats = {
+            user: {
+                'messages': int(row['messages']),
+                'potential_responses': int(row['potential_responses']),
+                'actual_responses': int(row['actual_responses']),
+                'response_rate': row['response_rate'],
+                'online_presence': row['online_presence'],
+                'ghosting_score': row['ghosting_score']
+            }
+            for user, row in ghosting.iterrows()
+        }
         
         if user_stats:
             # Identify top ghosters
@@ -1014,14 +1187,7 @@ class OnlinePresenceAnalyzer:
         try:
             # 1. User Activity Heatmap by Hour and Day
             plt.figure(figsize=(12, 8))
-            user_day_hour = pd.crosstab(
-                self.messages_df['day_of_week'], 
-                self.messages_df['hour']
-            )
-            
-            # Ensure days are in correct order
-            days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            user_day_hour = user_day_hour.reindex(days_order)
+            user_day_hour = self.activity_cube.weekday_hour()
             
             ax = sns.heatmap(user_day_hour, cmap='viridis', cbar_kws={'label': 'Message Count'})
             plt.title('User Activity by Hour and Day of Week')
@@ -1036,15 +1202,11 @@ class OnlinePresenceAnalyzer:
             
             # 2. User Time Period Preferences
             plt.figure(figsize=(12, 8))
-            period_counts = {}
-            
-            for user in self.messages_df['from'].value_counts().nlargest(10).index:
-                user_data = self.messages_df[self.messages_df['from'] == user]
-                periods = user_data['time_period'].value_counts().reindex(['morning', 'afternoon', 'evening', 'night'], fill_value=0)
-                period_counts[user] = periods
+            distribution = self.get_period_distribution()
+            period_counts = distribution.loc[distribution.sum(axis=1).nlargest(10).index]
             
-            if period_counts:
-                pd.DataFrame(period_counts).T.plot(kind='bar', stacked=True, colormap='viridis')
+            if not period_counts.empty:
+                period_counts.plot(kind='bar', stacked=True, colormap='viridis')
                 plt.title('Time Period Activity by User')
                 plt.xlabel('User')
                 plt.ylabel('Message Count')
@@ -1059,10 +1221,7 @@ class OnlinePresenceAnalyzer:
             
             # 3. Response Time Distribution
             plt.figure(figsize=(12, 8))
-            response_times = self.messages_df[
-                (self.messages_df['is_response'] == True) & 
-                (self.messages_df['time_since_prev'] <= 60)  # Limit to 60 min for readability
-            ]['time_since_prev']
+            response_times = self.get_response_latencies(max_minutes=60)['latency']  # Limit to 60 min for readability
             
             if not response_times.empty:
                 sns.histplot(response_times, bins=30, kde=True)
@@ -1087,36 +1246,9 @@ class OnlinePresenceAnalyzer:
             # 5. Ghosting Score Visualization
             plt.figure(figsize=(12, 8))
             
-            ghosting_scores = {}
-            for user in self.messages_df['from'].unique():
-                # Messages sent by this user
-                user_messages = len(self.messages_df[self.messages_df['from'] == user])
-                
-                # Only include users with sufficient activity
-                if user_messages < 10:
-                    continue
-                
-                # Messages this user could have responded to
-                potential_responses = len(self.messages_df[
-                    (self.messages_df['next_message_user'] == user) & 
-                    (self.messages_df['from'] != user) &
-                    (self.messages_df['time_until_next'] <= 60)
-                ])
-                
-                # Messages this user actually responded to
-                actual_responses = len(self.messages_df[
-                    (self.messages_df['from'] == user) & 
-                    (self.messages_df['is_response'] == True) &
-                    (self.messages_df['time_since_prev'] <= 60)
-                ])
-                
-                response_rate = actual_responses / potential_responses if potential_responses > 0 else 0
-                online_presence = user_messages / self.messages_df['from'].value_counts().sum()
-                
-                # Calculate ghosting score
-                if potential_responses >= 5:
-                    ghosting_score = online_presence * (1 - response_rate) * 100  # Scale to 0-100
-                    ghosting_scores[user] = ghosting_score
+            ghosting = self._ghosting_table()
+            ghosting = ghosting[(ghosting['messages'] >= 10) & (ghosting['potential_responses'] >= 5)]
+            ghosting_scores = (ghosting['ghosting_score'] * 100).to_dict()  # Scale to 0-100
             
             if ghosting_scores:
                 ghosting_df = pd.DataFrame({'User': list(ghosting_scores.keys()), 
@@ -1140,30 +1272,19 @@ class OnlinePresenceAnalyzer:
             # 6. Consistency Visualization
             plt.figure(figsize=(12, 8))
             
-            consistency_scores = {}
-            total_days = (self.messages_df['day'].max() - self.messages_df['day'].min()).days + 1
+            total_days = self.activity_cube.n_days
             
-            for user in self.messages_df['from'].unique():
-                user_messages = len(self.messages_df[self.messages_df['from'] == user])
-                
-                # Only include users with sufficient activity
-                if user_messages < 10:
-                    continue
-                
-                user_days = self.messages_df[self.messages_df['from'] == user]['day'].nunique()
-                daily_consistency = user_days / total_days if total_days > 0 else 0
-                
-                user_hours = self.messages_df[self.messages_df['from'] == user]['hour']
-                hour_variance = user_hours.var() if len(user_hours) > 5 else float('nan')
-                
-                # Normalize hour variance to 0-1 range (lower is better)
-                max_hour_variance = 24  # Theoretical maximum
-                hour_consistency = 1 - (hour_variance / max_hour_variance) if not np.isnan(hour_variance) else float('nan')
-                
-                # Combined consistency score
-                if not np.isnan(hour_consistency):
-                    combined_score = (daily_consistency + hour_consistency) / 2 * 100  # Scale to 0-100
-                    consistency_scores[user] = combined_score
+            # Only include users with sufficient activity
+            activity = self.get_activity_table()
+            activity = activity[activity['messages'] >= 10]
+            daily_consistency = activity['active_days'] / max(total_days, 1)
+            
+            # Normalize hour variance to 0-1 range (lower is better)
+            max_hour_variance = 24  # Theoretical maximum
+            hour_consistency = 1 - activity['hour_variance'] / max_hour_variance
+            
+            # Combined consistency score
+            consistency_scores = ((daily_consistency + hour_consistency) / 2 * 100).dropna().to_dict()  # Scale to 0-100
             
             if consistency_scores:
                 consistency_df = pd.DataFrame({'User': list(consistency_scores.keys()), 
@@ -1190,41 +1311,27 @@ class OnlinePresenceAnalyzer:
         try:
             import networkx as nx
             
-            # Create directed graph
-            G = nx.DiGraph()
-            
-            # Track who responds to whom
-            response_counts = defaultdict(Counter)
+            # Significant response patterns between the most responsive users only,
+            # so the layout stays small whatever the size of the group
+            edges = self.get_response_edges()
+            edges = edges[edges['count'] >= NETWORK_MIN_RESPONSES]
+            weights = pd.concat([
+                edges.groupby('responder')['count'].sum(),
+                edges.groupby('target')['count'].sum()
+            ]).groupby(level=0).sum()
+            users = weights.nlargest(NETWORK_MAX_USERS).index
+            edges = edges[edges['responder'].isin(users) & edges['target'].isin(users)]
             
-            # Identify response pairs
-            for i in range(1, len(self.messages_df)):
-                curr_msg = self.messages_df.iloc[i]
-                prev_msg = self.messages_df.iloc[i-1]
-                
-                # If message is a response and within 30 minutes
-                if (curr_msg['from'] != prev_msg['from'] and 
-                    curr_msg['time_since_prev'] <= 30):
-                    response_counts[curr_msg['from']][prev_msg['from']] += 1
-            
-            # Add nodes for users
-            for user in self.messages_df['from'].unique():
-                G.add_node(user)
-            
-            # Add edges with weights based on response counts
-            for responder, targets in response_counts.items():
-                for target, count in targets.items():
-                    if count >= 3:  # Only include significant response patterns
-                        G.add_edge(responder, target, weight=count)
+            G = nx.DiGraph()
+            G.add_weighted_edges_from(edges[['responder', 'target', 'count']].itertuples(index=False, name=None))
             
             # Draw the graph only if it has edges
             if G.number_of_edges() > 0:
                 plt.figure(figsize=(12, 12))
                 
                 # Calculate node sizes based on message counts
-                node_sizes = []
-                for user in G.nodes():
-                    count = len(self.messages_df[self.messages_df['from'] == user])
-                    node_sizes.append(max(300, 30 * count / 10))
+                message_counts = self.messages_df['from'].value_counts()
+                node_sizes = [max(300, 30 * message_counts.get(user, 0) / 10) for user in G.nodes()]
                 
                 # Calculate edge widths
                 edge_widths = [G[u][v]['weight'] / 2 for u, v in G.edges()]
@@ -1253,19 +1360,18 @@ class OnlinePresenceAnalyzer:
 
     def _analyze_response_latency(self) -> Dict:
         """Analyze how quickly users respond on average"""
-        latencies = {}
-        for user in self.messages_df["from"].unique():
-            # Only consider responses within a 2-hour window to avoid skewing by session gaps
-            user_responses = self.messages_df[
-                (self.messages_df["from"] == user) & 
-                (self.messages_df["is_response"]) & 
-                (self.messages_df["time_since_prev"] <= 120)
-            ]
-            if len(user_responses) >= 5:
-                latencies[user] = float(user_responses["time_since_prev"].median())
+        # Only responses within a 2-hour window count, to avoid skewing by session gaps
+        table = self.get_response_table()
+        table = table[table['latency_count'] >= 5]
+        latencies = table['latency_p50'].astype(float).to_dict()
         sorted_latencies = sorted(latencies.items(), key=lambda x: x[1])
         return {
             "response_latencies": latencies,
+            "latency_percentiles": {
+                user: {'p50': float(row['latency_p50']), 'p90': float(row['latency_p90']),
+                       'p99': float(row['latency_p99'])}
+                for user, row in table.iterrows()
+            },
             "fastest_responders": sorted_latencies[:3],
             "slowest_responders": sorted_latencies[-3:]
         }
@@ -1273,9 +1379,8 @@ class OnlinePresenceAnalyzer:
     def _generate_presence_heatmap(self):
         """Generate a collective 24/7 activity heatmap"""
         try:
-            heatmap_data = self.messages_df.groupby(["hour", "day_of_week"]).size().unstack(fill_value=0)
-            days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            heatmap_data = heatmap_data.reindex(columns=[d for d in days if d in heatmap_data.columns])
+            heatmap_data = self.activity_cube.weekday_hour().T
+            heatmap_data = heatmap_data.loc[:, heatmap_data.sum() > 0]
             plt.figure(figsize=(14, 10))
             sns.heatmap(heatmap_data, cmap="YlGnBu", annot=True, fmt="d")
             plt.title("Collective Presence Heatmap (Hour vs Day)")
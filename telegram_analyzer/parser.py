@@ -2,43 +2,114 @@
 Parser for Telegram export JSON data.
 """
 
+import os
 import json
 import pandas as pd
 import logging
-from typing import Dict
+from typing import Dict, List, Optional
 from tqdm import tqdm
-from nltk.sentiment import SentimentIntensityAnalyzer
-from .utils import extract_text_from_message, has_emoji, has_link
+from .utils import extract_text_from_message, EMOJI_PATTERN, LINK_PATTERN
+from .streaming import StreamingExportReader
+from .sentiment import SentimentScorer, SentimentCache
+from .lexicon import LexiconMatcher
+from .frame_cache import FrameCache
+from .schema import apply_compact_schema, memory_report, format_memory_report, SENTIMENT_COLUMNS
 import re
 
+# Bump whenever the processed DataFrame layout changes, to invalidate cached frames
+PARSER_VERSION = 2
+
 class TelegramDataParser:
     """Parser for Telegram export JSON data"""
     
-    def __init__(self, json_file: str):
+    def __init__(self, json_file: Optional[str], streaming: bool = False, batch_size: int = 10000,
+                 sentiment_workers: Optional[int] = 1, sentiment_chunk_size: int = 2000,
+                 cache_dir: Optional[str] = None, report_memory: bool = False,
+                 data: Optional[Dict] = None, incremental: bool = False):
+        """
+        Initialize the parser.
+        
+        Args:
+            json_file: Path to the Telegram export JSON file (None when ``data`` is given)
+            streaming: Walk the messages array incrementally instead of loading
+                the whole export into memory
+            batch_size: Number of messages converted to a DataFrame at a time
+            sentiment_workers: Worker processes used for sentiment scoring
+                (None uses all CPUs, 1 scores in-process)
+            sentiment_chunk_size: Number of texts sent to a sentiment worker per task
+            cache_dir: Directory for persistent caches shared across runs (disabled if None).
+                Sentiment scores and processed frames are cached there; a cached
+                frame is keyed by the file's content hash and PARSER_VERSION.
+            report_memory: Log how much memory the compact column layout saves
+                compared with the legacy object/dict layout
+            data: Already decoded chat export; see from_dict()
+            incremental: Keep a per-chat processed dataset in ``cache_dir`` and only
+                process messages newer than the last ones stored there. Edits
+                to previously processed messages are not picked up.
+        """
         self.logger = logging.getLogger(__name__)
         self.json_file = json_file
-        self.raw_data = self._load_json()
-        self.chat_info = self._extract_chat_info()
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self.report_memory = report_memory
+        self.incremental = incremental
+        sentiment_cache = SentimentCache(os.path.join(cache_dir, 'sentiment.sqlite3')) if cache_dir else None
+        self.sentiment_scorer = SentimentScorer(sentiment_workers, sentiment_chunk_size, sentiment_cache)
+        
+        # Look up a previously processed copy of this exact export
+        self.frame_cache = FrameCache(cache_dir) if cache_dir else None
+        self.cache_key = None
+        cached_info = None
+        if incremental and (self.frame_cache is None or not self.frame_cache.available):
+            self.logger.warning("Incremental mode needs cache_dir and pyarrow; processing the full export")
+            self.incremental = False
+        if self.frame_cache is not None and data is None and not self.incremental:
+            if self.frame_cache.available:
+                self.cache_key = f"{FrameCache.file_digest(json_file)}-v{PARSER_VERSION}"
+                cached_info = self.frame_cache.load_metadata(self.cache_key)
+            else:
+                self.logger.info("pyarrow is not installed; processed message caching is disabled")
+        
+        if data is not None:
+            # In-memory chat, e.g. one entry of a multi-chat export
+            self._validate_json_structure(data)
+            self.streaming = False
+            self.raw_data = data
+            self.chat_info = self._extract_chat_info()
+        elif cached_info is not None:
+            # Known export: JSON parsing is skipped and process_messages reads the cache
+            self.raw_data = None
+            self.chat_info = cached_info
+        else:
+            self.raw_data = self._load_json()
+            self.chat_info = self._extract_chat_info()
         
-        # Pre-compile regex for performance with expanded medical lexicon
-        self.health_pattern = re.compile(
-            r'\b(sick|pain|doctor|medicine|exercise|sleep|hospital|fever|cold|workout|diet|gym|wellness|ill|ache|clinic|therapy|'
-            r'headache|nausea|fatigue|cough|dizzy|blood pressure|diabetes|asthma|anxiety|depression|insomnia|'
-            r'surgery|emergency|ambulance|rehab|symptom|prescription|meds|dose|vaccine|allergy|injury|fracture|sprain|'
-            r'covid|flu|virus|infection|biopsy|scan|xray|mri|consultation|specialist|pharmacy)\b', 
-            re.IGNORECASE
-        )
-        self.care_pattern = re.compile(
-            r'\b(love|care|miss|hug|kiss|dear|sweet|heart|help|support|honey|darling|adore|cherish|grateful|appreciate|respect|kind|'
-            r'stay strong|take care|get well|healing|praying|thinking of you|here for you|comfort|sympathy|empathy|solidarity)\b', 
-            re.IGNORECASE
-        )
+        # One combined matcher for all keyword categories (health, care, ...)
+        self.lexicon = LexiconMatcher()
+
+    @classmethod
+    def from_dict(cls, data: Dict, **kwargs) -> 'TelegramDataParser':
+        """
+        Create a parser for a chat export that is already decoded.
+
+        Args:
+            data: Chat export dictionary with 'name', 'type', 'id' and 'messages'
+            **kwargs: Other constructor options (streaming does not apply)
+
+        Returns:
+            Parser for the given chat
+        """
+        return cls(None, data=data, **kwargs)
 
     def _load_json(self) -> Dict:
-        """Load and validate JSON data"""
+        """Load and validate JSON data (only the header fields in streaming mode)"""
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if self.streaming:
+                data = StreamingExportReader(self.json_file).read_header()
+            else:
+                with open(self.json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             self._validate_json_structure(data)
             return data
         except Exception as e:
@@ -48,93 +119,204 @@ class TelegramDataParser:
     def _validate_json_structure(self, data: Dict):
         """Validate the JSON structure meets Telegram export format"""
         required_fields = ['name', 'type', 'id', 'messages']
+        if 'messages' not in data and 'chats' in data:
+            raise ValueError("Invalid JSON structure: this is a multi-chat export; "
+                             "use telegram_analyzer.batch.BatchIngestor to parse it")
         for field in required_fields:
             if field not in data:
                 raise ValueError(f"Invalid JSON structure: missing '{field}' field")
 
     def _extract_chat_info(self) -> Dict:
         """Extract chat metadata"""
+        # In streaming mode the message count is only known once the array has been walked
+        messages = self.raw_data['messages']
         return {
             'name': self.raw_data['name'],
             'type': self.raw_data['type'],
             'id': self.raw_data['id'],
-            'messages_count': len(self.raw_data['messages'])
+            'messages_count': len(messages) if messages is not None else None
         }
 
+    def _iter_raw_messages(self):
+        """Iterate over raw message dicts from memory or from the file stream"""
+        if self.streaming:
+            return StreamingExportReader(self.json_file).iter_items()
+        return iter(self.raw_data['messages'])
+
     def process_messages(self) -> pd.DataFrame:
-        """Process all messages and convert to DataFrame"""
-        messages_list = []
+        """Process all messages and convert to DataFrame, reusing the frame cache when possible"""
+        if self.incremental:
+            return self._process_incremental()
+        
+        if self.raw_data is None:
+            df = self.frame_cache.load(self.cache_key)
+            if df is not None:
+                self._log_memory_report(df)
+                return df
+            # The cache entry disappeared or is unreadable; parse the export after all
+            self.raw_data = self._load_json()
+        
+        df = self._process_raw_messages()
+        self._log_memory_report(df)
+        if self.cache_key is not None:
+            self.frame_cache.store(self.cache_key, df, self.chat_info)
+        return df
+
+    def _process_incremental(self) -> pd.DataFrame:
+        """Process only messages past the stored watermark and merge them into the chat's dataset"""
+        dataset_key = f"chat-{self.chat_info['id']}-v{PARSER_VERSION}"
+        stored_info = self.frame_cache.load_metadata(dataset_key)
+        watermark = stored_info.get('watermark') if stored_info else None
+        previous = self.frame_cache.load(dataset_key) if watermark else None
+        if previous is None:
+            watermark = None
+        
+        new_df = self._process_raw_messages(after=watermark)
+        if previous is not None and len(new_df):
+            df = pd.concat([previous, new_df], ignore_index=True)
+            df = df.sort_values('date', kind='stable').reset_index(drop=True)
+            # Categories of the stored and the new messages differ
+            apply_compact_schema(df)
+        elif previous is not None:
+            df = previous
+        else:
+            df = new_df
+        self.logger.info(f"Added {len(new_df)} new messages to {len(df) - len(new_df)} stored messages")
+        
+        self.chat_info['messages_count'] = len(df)
+        self.chat_info['new_messages'] = len(new_df)
+        self.chat_info['watermark'] = self._watermark(df) if len(df) else watermark
+        if len(new_df) or previous is None:
+            self.frame_cache.store(dataset_key, df, self.chat_info)
+        self._log_memory_report(df)
+        return df
+
+    @staticmethod
+    def _watermark(df: pd.DataFrame) -> Dict:
+        """Highest message id and latest date of a processed frame"""
+        ids = df['message_id']
+        numeric = pd.api.types.is_integer_dtype(ids) and ids.notna().any()
+        return {
+            'message_id': int(ids.max()) if numeric else None,
+            'date': df['date'].max().isoformat(),
+        }
+
+    @staticmethod
+    def _is_new(msg: Dict, watermark: Dict) -> bool:
+        """Whether a raw message comes after the watermark (by id, or by date for non-numeric ids)"""
+        msg_id = msg.get('id')
+        if watermark['message_id'] is not None and isinstance(msg_id, int):
+            return msg_id > watermark['message_id']
+        date = msg.get('date')
+        return date is not None and pd.Timestamp(date) > pd.Timestamp(watermark['date'])
+
+    def _process_raw_messages(self, after: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Parse raw messages and add all derived columns.
+        
+        Args:
+            after: Watermark from _watermark(); older messages are skipped
+        """
+        frames = []
+        batch = []
+        seen = 0
         
         try:
-            for msg in tqdm(self.raw_data['messages'], desc="Processing messages"):
+            for msg in tqdm(self._iter_raw_messages(), total=self.chat_info['messages_count'],
+                            desc="Processing messages"):
+                seen += 1
                 if not isinstance(msg, dict):
                     continue
-                    
-                processed_msg = self._process_single_message(msg)
-                if processed_msg:
-                    messages_list.append(processed_msg)
+                if after is not None and not self._is_new(msg, after):
+                    continue
+                batch.append(msg)
+                
+                # Flush in batches so raw messages never accumulate in streaming mode
+                if len(batch) >= self.batch_size:
+                    frames.append(self._build_frame(batch))
+                    batch = []
+            
+            if batch or not frames:
+                frames.append(self._build_frame(batch))
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            self.chat_info['messages_count'] = seen
             
-            df = pd.DataFrame(messages_list)
+            # Text features computed over whole columns
+            self._add_text_features(df)
             
             # Convert date strings to datetime objects
             df['date'] = pd.to_datetime(df['date'])
             
-            # Add sentiment analysis
-            sia = SentimentIntensityAnalyzer()
-            df['sentiment_scores'] = df['text'].apply(
-                lambda x: sia.polarity_scores(str(x)) if pd.notnull(x) else None
-            )
-            df['sentiment'] = df['sentiment_scores'].apply(
-                lambda x: x['compound'] if x is not None else None
-            )
+            # Add sentiment analysis, one float column per VADER score
+            scores = self.sentiment_scorer.score(df['text'].tolist())
+            for column, key in SENTIMENT_COLUMNS.items():
+                df[column] = [score[key] for score in scores]
             
-            # Add detailed emotional categories (Vectorized or optimized)
-            df['health_mentions'] = df['text'].apply(lambda x: bool(self.health_pattern.search(str(x))) if pd.notnull(x) else False)
-            df['care_mentions'] = df['text'].apply(lambda x: bool(self.care_pattern.search(str(x))) if pd.notnull(x) else False)
-            df['mood_intensity'] = df['sentiment_scores'].apply(lambda x: (x['pos'] + x['neg']) if x is not None else 0)
+            # Add detailed emotional categories in a single pass over the text column
+            for category, flags in self.lexicon.flag_frame(df['text']).items():
+                df[f'{category}_mentions'] = flags
+            df['mood_intensity'] = df['sentiment_pos'] + df['sentiment_neg']
             
             # Sort by date and reset index
             df = df.sort_values('date').reset_index(drop=True)
             
+            # Categoricals, nullable integers and float32 scores
+            apply_compact_schema(df)
+            
             return df
             
         except Exception as e:
             self.logger.error(f"Error processing messages: {str(e)}")
             raise
 
+    def _log_memory_report(self, df: pd.DataFrame):
+        """Log the compact vs legacy memory comparison when requested"""
+        if self.report_memory:
+            self.logger.info("Processed message memory usage:\n" + format_memory_report(memory_report(df)))
+
     def _detect_category(self, text: str, pattern: re.Pattern) -> bool:
         """Detect if text contains any keywords from a category pattern"""
         if not text or text == 'None':
             return False
         return bool(pattern.search(text))
 
-    def _process_single_message(self, msg: Dict) -> Dict:
-        """Process a single message and extract relevant information"""
-        try:
-            # Extract basic message info
-            processed = {
-                'message_id': msg.get('id', None),
-                'date': msg.get('date', None),
-                'from': msg.get('from', None),
-                'type': msg.get('type', None),
-                'text': extract_text_from_message(msg),
-                'media_type': msg.get('media_type', None),
-                'file': msg.get('file', None),
-                'reply_to_message_id': msg.get('reply_to_message_id', None),
-                'forwarded_from': msg.get('forwarded_from', None),
-            }
-
-            text = extract_text_from_message(msg)
-            if text:
-                processed.update({
-                    'text_length': len(text),
-                    'word_count': len(text.split()),
-                    'has_emoji': has_emoji(text),
-                    'has_link': has_link(text)
-                })
-
-            return processed
+    def _build_frame(self, messages: List[Dict]) -> pd.DataFrame:
+        """Convert a batch of raw messages to a DataFrame, filling columns directly"""
+        kept = []
+        texts = []
+        for msg in messages:
+            try:
+                texts.append(extract_text_from_message(msg))
+                kept.append(msg)
+            except Exception as e:
+                self.logger.warning(f"Error processing message: {str(e)}")
+        
+        return pd.DataFrame({
+            'message_id': [msg.get('id') for msg in kept],
+            'date': [msg.get('date') for msg in kept],
+            'from': [msg.get('from') for msg in kept],
+            'type': [msg.get('type') for msg in kept],
+            # Explicit dtype keeps the .str accessor usable on empty batches
+            'text': pd.Series(texts, dtype='str'),
+            'media_type': [msg.get('media_type') for msg in kept],
+            'file': [msg.get('file') for msg in kept],
+            'reply_to_message_id': [msg.get('reply_to_message_id') for msg in kept],
+            'forwarded_from': [msg.get('forwarded_from') for msg in kept],
+        })
 
-        except Exception as e:
-            self.logger.warning(f"Error processing message: {str(e)}")
-            return None
+    def _add_text_features(self, df: pd.DataFrame):
+        """Add length, word count, emoji and link columns (left empty for messages without text)"""
+        text = df['text']
+        lengths = text.str.len()
+        has_text = lengths > 0
+        
+        df['text_length'] = lengths.where(has_text)
+        df['word_count'] = text.str.count(r'\S+').where(has_text)
+        
+        # Emoji sequences are extracted once here; downstream stats reuse the 'emojis' column
+        contains_emoji = text.str.contains(EMOJI_PATTERN)
+        emojis = pd.Series(None, index=df.index, dtype=object)
+        emojis[contains_emoji] = text[contains_emoji].str.findall(EMOJI_PATTERN)
+        df['emojis'] = emojis
+        df['has_emoji'] = contains_emoji.where(has_text)
+        df['has_link'] = text.str.contains(LINK_PATTERN).where(has_text)
@@ -0,0 +1,297 @@
+"""
+Reply graph built from the explicit reply links of messages.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+
+class ReplyGraph:
+    """
+    Threads formed by messages replying to each other.
+
+    Replies are joined to their parent messages through a hash index on
+    'message_id' (per chat when a 'chat_id' column is present). Links to
+    messages missing from the export, or to messages that are not older than
+    the reply, are dropped, so every thread is a tree. Thread roots and depths
+    are resolved by pointer jumping, which takes a number of vectorized passes
+    logarithmic in the depth of the deepest thread.
+
+    Per-message arrays ('parent', 'root', 'depth', 'fan_out', 'latency') are
+    aligned to the row positions of the DataFrame. Latencies are in minutes,
+    like the response times of the rest of the analysis.
+    """
+
+    def __init__(self, df: pd.DataFrame, order: Optional[np.ndarray] = None):
+        """
+        Build the graph.
+
+        Args:
+            df: DataFrame of processed messages with 'message_id', 'date' and 'from'
+                columns; 'reply_to_message_id' holds the reply links
+            order: Row positions of the messages sorted by date, when already computed
+        """
+        self.logger = logging.getLogger(__name__)
+        self.df = df
+        n = len(df)
+        self._dates = df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self.order = np.argsort(self._dates, kind='stable') if order is None else order
+
+        # Parents must precede their replies (by date, then by id for equal dates),
+        # which rules out cycles in malformed exports
+        parent = self._join_parents(df)
+        sequence = self.order
+        if 'message_id' in df.columns and pd.api.types.is_numeric_dtype(df['message_id']):
+            ids = df['message_id'].to_numpy(dtype=np.float64, na_value=np.inf)
+            sequence = np.lexsort((ids, self._dates))
+        rank = np.empty(n, dtype=np.int64)
+        rank[sequence] = np.arange(n)
+        linked = parent >= 0
+        linked[linked] = rank[parent[linked]] < rank[linked]
+        self.parent = np.where(linked, parent, -1)
+
+        self.root, self.depth = self._resolve_threads(self.parent)
+        replies = np.flatnonzero(self.is_reply)
+        self.fan_out = np.bincount(self.parent[replies], minlength=n)
+        self.latency = np.full(n, np.nan)
+        self.latency[replies] = (self._dates[replies] - self._dates[self.parent[replies]]) / 6e10
+        self._senders = df['from'].to_numpy(dtype=object, na_value=None)
+
+    @staticmethod
+    def _join_parents(df: pd.DataFrame) -> np.ndarray:
+        """Row position of the message each message replies to (-1 when none is found)"""
+        if 'reply_to_message_id' not in df.columns or 'message_id' not in df.columns or df.empty:
+            return np.full(len(df), -1, dtype=np.int64)
+
+        reply_to = df['reply_to_message_id']
+        if 'chat_id' in df.columns:
+            chats = pd.factorize(df['chat_id'])[0]
+            keys = pd.MultiIndex.from_arrays([chats, df['message_id']])
+            targets = pd.MultiIndex.from_arrays([chats, reply_to])
+        else:
+            keys = pd.Index(df['message_id'])
+            targets = pd.Index(reply_to)
+
+        # The first message wins when an id repeats
+        first = ~keys.duplicated()
+        positions = np.flatnonzero(first)
+        found = keys[first].get_indexer(targets)
+        parent = np.where(found >= 0, positions[found], -1)
+        parent[reply_to.isna().to_numpy()] = -1
+        return parent.astype(np.int64)
+
+    @staticmethod
+    def _resolve_threads(parent: np.ndarray):
+        """Thread root and depth of every message, by pointer jumping"""
+        ancestor = np.where(parent >= 0, parent, np.arange(len(parent)))
+        distance = (parent >= 0).astype(np.int64)
+        while True:
+            next_ancestor = ancestor[ancestor]
+            if np.array_equal(next_ancestor, ancestor):
+                return ancestor, distance
+            distance = distance + distance[ancestor]
+            ancestor = next_ancestor
+
+    @property
+    def is_reply(self) -> np.ndarray:
+        """Whether each message replies to a message found in the export"""
+        return self.parent >= 0
+
+    @property
+    def reply_count(self) -> int:
+        """Number of resolved replies"""
+        return int(self.is_reply.sum())
+
+    def response_targets(self, eligible: Optional[np.ndarray] = None,
+                         max_gap_seconds: Optional[float] = None) -> np.ndarray:
+        """
+        Message each message answers: its parent for an explicit reply,
+        otherwise the previous eligible message in date order.
+
+        Args:
+            eligible: Mask of the messages that can answer or be answered (all when None)
+            max_gap_seconds: Maximum time to the previous message for an implicit answer
+
+        Returns:
+            Row position of the answered message (-1 when none)
+        """
+        n = len(self.parent)
+        eligible = np.ones(n, dtype=bool) if eligible is None else np.asarray(eligible, dtype=bool)
+        targets = np.full(n, -1, dtype=np.int64)
+
+        sequence = self.order[eligible[self.order]]
+        targets[sequence[1:]] = sequence[:-1]
+        if max_gap_seconds is not None:
+            answering = sequence[1:]
+            late = self._dates[answering] - self._dates[sequence[:-1]] > max_gap_seconds * 1e9
+            targets[answering[late]] = -1
+
+        explicit = self.is_reply & eligible
+        explicit[explicit] = eligible[self.parent[explicit]]
+        targets[explicit] = self.parent[explicit]
+        targets[~eligible] = -1
+        return targets
+
+    def interactions(self, max_gap_seconds: Optional[float] = None) -> pd.DataFrame:
+        """
+        Who answers whom, one row per message answering another sender.
+
+        Explicit replies are always used; other messages are taken to answer
+        the previous message (see response_targets()). Messages without a
+        sender are ignored.
+
+        Args:
+            max_gap_seconds: Maximum time to the previous message for an implicit answer
+
+        Returns:
+            DataFrame with 'position' and 'target_position' (row positions), 'responder',
+            'target' (senders) and 'explicit' (whether the message is a reply)
+        """
+        has_sender = np.array([sender is not None for sender in self._senders], dtype=bool)
+        targets = self.response_targets(has_sender, max_gap_seconds)
+        positions = np.flatnonzero(targets >= 0)
+        targets = targets[positions]
+        responders, answered = self._senders[positions], self._senders[targets]
+        other = responders != answered
+        return pd.DataFrame({
+            'position': positions[other],
+            'target_position': targets[other],
+            'responder': responders[other],
+            'target': answered[other],
+            'explicit': self.is_reply[positions[other]],
+        })
+
+    @property
+    def edges(self) -> pd.DataFrame:
+        """
+        Explicit replies between users, one row per (responder, target) pair.
+
+        Returns:
+            DataFrame with 'responder', 'target', 'count', 'mean_sentiment' of the
+            replies and 'median_latency' in minutes, most frequent pairs first
+        """
+        replies = np.flatnonzero(self.is_reply)
+        frame = pd.DataFrame({
+            'responder': self._senders[replies],
+            'target': self._senders[self.parent[replies]],
+            'sentiment': self._sentiment()[replies],
+            'latency': self.latency[replies],
+        })
+        frame = frame[frame['responder'].notna() & frame['target'].notna() & (frame['responder'] != frame['target'])]
+        edges = frame.groupby(['responder', 'target'], sort=False).agg(
+            count=('latency', 'size'),
+            mean_sentiment=('sentiment', 'mean'),
+            median_latency=('latency', 'median'),
+        ).reset_index()
+        return edges.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    @property
+    def threads(self) -> pd.DataFrame:
+        """
+        Threads with at least one reply, one row per thread.
+
+        Returns:
+            DataFrame indexed by the row position of the root message, with 'message_id'
+            of the root, 'started' and 'last_reply' dates, 'messages', 'max_depth',
+            'max_fan_out' and 'participants', longest threads first
+        """
+        threaded = np.flatnonzero(self.is_reply | (self.fan_out > 0))
+        frame = pd.DataFrame({
+            'root': self.root[threaded],
+            'date': self.df['date'].to_numpy()[threaded],
+            'depth': self.depth[threaded],
+            'fan_out': self.fan_out[threaded],
+            'from': self._senders[threaded],
+        })
+        threads = frame.groupby('root').agg(
+            started=('date', 'min'),
+            last_reply=('date', 'max'),
+            messages=('date', 'size'),
+            max_depth=('depth', 'max'),
+            max_fan_out=('fan_out', 'max'),
+            participants=('from', 'nunique'),
+        )
+        if 'message_id' in self.df.columns:
+            threads.insert(0, 'message_id', self.df['message_id'].to_numpy()[threads.index.to_numpy()])
+        return threads.sort_values('messages', ascending=False, kind='stable')
+
+    @property
+    def user_table(self) -> pd.DataFrame:
+        """
+        Reply behaviour per user.
+
+        Returns:
+            DataFrame indexed by sender with 'replies_sent', 'replies_received',
+            'threads_started' and the 'median_latency' and 'mean_latency' in minutes
+            of the user's replies
+        """
+        replies = np.flatnonzero(self.is_reply)
+        sent = pd.DataFrame({'from': self._senders[replies], 'latency': self.latency[replies]}).groupby(
+            'from')['latency'].agg(replies_sent='size', median_latency='median', mean_latency='mean')
+        received = pd.Series(self._senders[self.parent[replies]]).value_counts().rename('replies_received')
+        roots = np.flatnonzero((self.fan_out > 0) & ~self.is_reply)
+        started = pd.Series(self._senders[roots]).value_counts().rename('threads_started')
+
+        table = sent.join(received, how='outer').join(started, how='outer')
+        counts = ['replies_sent', 'replies_received', 'threads_started']
+        table[counts] = table[counts].fillna(0).astype(int)
+        return table[['replies_sent', 'replies_received', 'threads_started', 'median_latency', 'mean_latency']]
+
+    def _sentiment(self) -> np.ndarray:
+        if 'sentiment' in self.df.columns:
+            return self.df['sentiment'].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.zeros(len(self.df))
+
+    def summary(self, top: int = 5) -> Dict:
+        """
+        Summary statistics of the reply structure.
+
+        Args:
+            top: Number of longest threads and most frequent reply pairs listed
+
+        Returns:
+            Dictionary of reply counts, thread shape statistics, reply latency
+            percentiles in minutes and per-user reply behaviour
+        """
+        n = len(self.parent)
+        threads = self.threads
+        latency = self.latency[self.is_reply]
+        edges = self.edges.head(top)
+        return {
+            'replies': self.reply_count,
+            'reply_rate': self.reply_count / n if n else 0.0,
+            'threads': len(threads),
+            'avg_thread_size': float(threads['messages'].mean()) if len(threads) else 0.0,
+            'max_depth': int(self.depth.max()) if n else 0,
+            'max_fan_out': int(self.fan_out.max()) if n else 0,
+            'reply_latency': {
+                'median': float(np.median(latency)) if len(latency) else None,
+                'p90': float(np.percentile(latency, 90)) if len(latency) else None,
+            },
+            'longest_threads': [
+                {
+                    'message_id': row.get('message_id'),
+                    'started': row['started'],
+                    'messages': int(row['messages']),
+                    'max_depth': int(row['max_depth']),
+                    'participants': int(row['participants']),
+                }
+                for _, row in threads.head(top).iterrows()
+            ],
+            'top_reply_pairs': [
+                {'responder': responder, 'target': target, 'count': int(count), 'median_latency': float(latency)}
+                for responder, target, count, latency in zip(
+                    edges['responder'], edges['target'], edges['count'], edges['median_latency'])
+            ],
+            'users': {
+                str(user): {
+                    'replies_sent': int(row['replies_sent']),
+                    'replies_received': int(row['replies_received']),
+                    'threads_started': int(row['threads_started']),
+                    'median_latency': None if pd.isna(row['median_latency']) else float(row['median_latency']),
+                }
+                for user, row in self.user_table.iterrows()
+            },
+        }
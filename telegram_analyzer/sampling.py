@@ -0,0 +1,150 @@
+"""
+Stratified message sampling with confidence intervals for approximate statistics.
+"""
+
+import logging
+import numpy as np
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence
+
+
+class StratifiedSample:
+    """
+    Stratified random sample of message rows with estimators for the full chat.
+
+    Each stratum (e.g. one user in one month) contributes ``fraction`` of its
+    rows, rounded up and at least ``min_per_stratum``, so quiet users and
+    months are represented as well as busy ones. Means and totals are
+    estimated with the stratified estimators, including the finite
+    population correction, and their confidence intervals use the normal
+    approximation. Strata sampled in full contribute no uncertainty. Missing
+    (NaN) values are left out of means, which are estimated as the ratio of
+    the estimated total to the estimated number of rows with a value, and
+    count as zero in totals.
+    """
+
+    def __init__(self, strata: np.ndarray, fraction: float, min_per_stratum: int = 2,
+                 random_state: Optional[int] = None):
+        """
+        Draw the sample.
+
+        Args:
+            strata: Stratum code (0 to number of strata - 1) of every row
+            fraction: Share of each stratum's rows to sample (0 < fraction <= 1)
+            min_per_stratum: Minimum rows sampled from a stratum (all rows if it has fewer)
+            random_state: Seed of the random generator
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction must be in (0, 1]")
+        self.logger = logging.getLogger(__name__)
+        self.fraction = fraction
+        strata = np.asarray(strata, dtype=np.int64)
+        rng = np.random.default_rng(random_state)
+
+        # Rows grouped by stratum, in random order within each stratum
+        order = np.lexsort((rng.random(len(strata)), strata))
+        self.population_sizes = np.bincount(strata) if len(strata) else np.zeros(0, dtype=np.int64)
+        self.sample_sizes = np.minimum(
+            self.population_sizes,
+            np.maximum(np.ceil(fraction * self.population_sizes), min_per_stratum)
+        ).astype(np.int64)
+
+        starts = np.repeat(np.cumsum(self.population_sizes) - self.population_sizes, self.population_sizes)
+        keep = np.arange(len(strata)) - starts < np.repeat(self.sample_sizes, self.population_sizes)
+        self.positions = np.sort(order[keep])
+        self.strata = strata[self.positions]
+
+    @property
+    def size(self) -> int:
+        """Number of sampled rows"""
+        return len(self.positions)
+
+    @property
+    def population_size(self) -> int:
+        """Number of rows sampled from"""
+        return int(self.population_sizes.sum())
+
+    def _stratum_moments(self, values: np.ndarray):
+        """Per-stratum sample size, mean and variance of a value over all sampled rows"""
+        n_strata = len(self.population_sizes)
+        counts = np.bincount(self.strata, minlength=n_strata)
+        sums = np.bincount(self.strata, weights=values, minlength=n_strata)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / counts, 0.0)
+            squares = np.bincount(self.strata, weights=(values - means[self.strata]) ** 2, minlength=n_strata)
+            variances = np.where(counts > 1, squares / (counts - 1), 0.0)
+        return counts, means, variances
+
+    def _estimate(self, values: np.ndarray, domains: Optional[Sequence], confidence: float, mean: bool):
+        # Missing values count as zero in totals; means are ratio estimators, the estimated
+        # total of the values over the estimated number of rows with a value
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        observed = np.where(valid, values, 0.0)
+        sizes = self.population_sizes.astype(np.float64)
+
+        if domains is None:
+            labels, codes = [None], np.zeros(len(sizes), dtype=np.int64)
+        else:
+            labels, codes = np.unique(np.asarray(domains, dtype=object), return_inverse=True)
+
+        def domain_sum(per_stratum):
+            return np.bincount(codes, weights=per_stratum, minlength=len(labels))
+
+        counts, value_means, _ = self._stratum_moments(observed)
+        totals = domain_sum(sizes * value_means)
+        if mean:
+            _, valid_means, _ = self._stratum_moments(valid.astype(np.float64))
+            divisors = domain_sum(sizes * valid_means)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                estimates = np.where(divisors > 0, totals / divisors, np.nan)
+            # Linearized residuals of the ratio, whose variance is that of the estimate
+            residuals = observed - np.nan_to_num(estimates)[codes[self.strata]] * valid
+        else:
+            divisors = np.ones(len(labels))
+            estimates = totals
+            residuals = observed
+
+        _, _, variances = self._stratum_moments(residuals)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correction = np.where(counts > 0, 1 - counts / sizes, 0.0)
+            stratum_variance = np.where(counts > 0, sizes ** 2 * correction * variances / counts, 0.0)
+            spreads = np.sqrt(domain_sum(stratum_variance)) / divisors
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+        intervals = [
+            {'estimate': float(estimate), 'low': float(estimate - z * spread), 'high': float(estimate + z * spread)}
+            for estimate, spread in zip(estimates, spreads)
+        ]
+        if domains is None:
+            return intervals[0]
+        return dict(zip(labels, intervals))
+
+    def mean(self, values: np.ndarray, domains: Optional[Sequence] = None, confidence: float = 0.95) -> Dict:
+        """
+        Estimate the mean of a value over all rows.
+
+        Args:
+            values: Value of every sampled row (aligned with ``positions``); NaN values are ignored
+            domains: Label of every stratum, to estimate one mean per label (e.g. the user of
+                each user-month stratum)
+            confidence: Confidence level of the intervals
+
+        Returns:
+            Dictionary with 'estimate', 'low' and 'high', or one such dictionary per domain label
+        """
+        return self._estimate(values, domains, confidence, mean=True)
+
+    def total(self, values: np.ndarray, domains: Optional[Sequence] = None, confidence: float = 0.95) -> Dict:
+        """
+        Estimate the sum of a value over all rows, e.g. a count when the values are 0/1 indicators.
+
+        Args:
+            values: Value of every sampled row (aligned with ``positions``); NaN values count as zero
+            domains: Label of every stratum, to estimate one total per label
+            confidence: Confidence level of the intervals
+
+        Returns:
+            Dictionary with 'estimate', 'low' and 'high', or one such dictionary per domain label
+        """
+        return self._estimate(values, domains, confidence, mean=False)
@@ -0,0 +1,155 @@
+"""
+Compact column dtypes for processed message DataFrames.
+"""
+
+import logging
+import pandas as pd
+from typing import Dict
+
+# Low-cardinality text columns stored as categoricals
+CATEGORICAL_COLUMNS = ('from', 'type', 'media_type', 'forwarded_from', 'chat_id', 'chat_name')
+
+# Identifier columns stored as nullable 64-bit integers
+ID_COLUMNS = ('message_id', 'reply_to_message_id')
+
+# Per-message counts, NaN for messages without text. Stored as float32 rather
+# than a nullable integer so that means over text-less groups stay NaN.
+COUNT_COLUMNS = ('text_length', 'word_count')
+
+# Per-message flags, empty for messages without text
+FLAG_COLUMNS = ('has_emoji', 'has_link')
+
+# Sentiment columns; 'sentiment' holds the VADER compound score
+SENTIMENT_COLUMNS = {
+    'sentiment_neg': 'neg',
+    'sentiment_neu': 'neu',
+    'sentiment_pos': 'pos',
+    'sentiment': 'compound',
+}
+SCORE_COLUMNS = tuple(SENTIMENT_COLUMNS) + ('mood_intensity',)
+
+logger = logging.getLogger(__name__)
+
+
+def apply_compact_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the columns of a processed DataFrame to compact dtypes in place.
+
+    Columns that are missing are skipped, so the function can be applied to
+    partially processed frames. Identifier columns that hold non-numeric
+    values (e.g. ids from converted HTML exports) are left unchanged.
+
+    Args:
+        df: Processed messages DataFrame
+
+    Returns:
+        The same DataFrame, for chaining
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    for column in ID_COLUMNS:
+        if column in df.columns and df[column].dtype != 'Int64':
+            numeric = pd.to_numeric(df[column], errors='coerce')
+            if numeric.isna().sum() == df[column].isna().sum():
+                df[column] = numeric.astype('Int64')
+            else:
+                logger.debug(f"Keeping non-numeric identifiers in '{column}'")
+
+    for column in FLAG_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('boolean')
+
+    for column in COUNT_COLUMNS + SCORE_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('float32')
+
+    return df
+
+
+def to_legacy_layout(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuild the pre-compact layout of a processed DataFrame.
+
+    Categoricals become object strings, nullable numbers become float64, and
+    the sentiment columns are folded back into a 'sentiment_scores' column of
+    dicts. Used as the baseline of memory_report().
+
+    Args:
+        df: Processed messages DataFrame in the compact layout
+
+    Returns:
+        New DataFrame in the legacy layout
+    """
+    legacy = {}
+    for column in df.columns:
+        if column in SENTIMENT_COLUMNS and column != 'sentiment':
+            continue
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS:
+            series = series.astype(object).where(series.notna(), None)
+        elif column in ID_COLUMNS + COUNT_COLUMNS or column in SCORE_COLUMNS:
+            series = series.astype('float64') if series.dtype != object else series
+        elif column in FLAG_COLUMNS:
+            series = series.astype(object).where(series.notna(), float('nan'))
+        legacy[column] = series
+
+    if all(column in df.columns for column in SENTIMENT_COLUMNS):
+        parts = {key: df[column].astype('float64').tolist() for column, key in SENTIMENT_COLUMNS.items()}
+        legacy['sentiment_scores'] = [
+            dict(zip(parts, values)) for values in zip(*parts.values())
+        ]
+    return pd.DataFrame(legacy, index=df.index)
+
+
+def memory_report(df: pd.DataFrame) -> Dict:
+    """
+    Compare the memory footprint of the compact and legacy layouts.
+
+    Args:
+        df: Processed messages DataFrame in the compact layout
+
+    Returns:
+        Dictionary with per-column and total deep memory usage in bytes
+    """
+    compact = df.memory_usage(index=False, deep=True)
+    legacy = to_legacy_layout(df).memory_usage(index=False, deep=True)
+
+    columns = {}
+    for column in legacy.index.union(compact.index, sort=False):
+        columns[column] = {
+            'legacy_bytes': int(legacy.get(column, 0)),
+            'compact_bytes': int(compact.get(column, 0)),
+        }
+
+    legacy_total = int(legacy.sum())
+    compact_total = int(compact.sum())
+    return {
+        'columns': columns,
+        'legacy_bytes': legacy_total,
+        'compact_bytes': compact_total,
+        'saved_bytes': legacy_total - compact_total,
+        'ratio': compact_total / legacy_total if legacy_total else 1.0,
+    }
+
+
+def format_memory_report(report: Dict) -> str:
+    """
+    Render a memory report as a plain-text table.
+
+    Args:
+        report: Result of memory_report()
+
+    Returns:
+        Multi-line table of per-column and total usage
+    """
+    def mib(size):
+        return f"{size / (1 << 20):10.2f}"
+
+    lines = [f"{'column':<24}{'legacy MiB':>12}{'compact MiB':>12}"]
+    for column, usage in report['columns'].items():
+        lines.append(f"{column:<24}  {mib(usage['legacy_bytes'])}  {mib(usage['compact_bytes'])}")
+    lines.append(f"{'total':<24}  {mib(report['legacy_bytes'])}  {mib(report['compact_bytes'])}")
+    lines.append(f"Compact layout uses {report['ratio']:.0%} of the legacy footprint")
+    return '\n'.join(lines)
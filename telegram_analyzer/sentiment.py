@@ -0,0 +1,214 @@
+"""
+Sentiment scoring for processed messages.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+from nltk.sentiment import SentimentIntensityAnalyzer
+
+# Per-process analyzer, created once by the pool initializer
+_worker_analyzer = None
+
+
+def _init_worker():
+    """Load the VADER lexicon once per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_chunk(texts: List[str]) -> List[Dict]:
+    """Score one shard of texts inside a worker process"""
+    return [_worker_analyzer.polarity_scores(text) for text in texts]
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace; VADER tokenizes on whitespace, so scores are unchanged"""
+    return ' '.join(str(text).split())
+
+
+class SentimentCache:
+    """
+    Persistent sentiment score store keyed by a hash of the normalized text.
+
+    Entries are evicted least-recently-used first once ``max_entries`` is exceeded.
+    """
+
+    # Stay below SQLite's default limit on bound parameters per statement
+    _QUERY_BATCH = 900
+
+    def __init__(self, path: str, max_entries: int = 500000):
+        """
+        Initialize the sentiment cache.
+
+        Args:
+            path: Path of the SQLite database file (created if missing)
+            max_entries: Maximum number of cached texts kept on disk
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS scores ('
+                    'key TEXT PRIMARY KEY, neg REAL, neu REAL, pos REAL, compound REAL, last_used INTEGER)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)')
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; one per call keeps the cache usable from any thread"""
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key_for(text: str) -> str:
+        """Content hash of an already normalized text"""
+        return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Look up cached scores and mark the hits as recently used.
+
+        Args:
+            keys: Text hashes from key_for()
+
+        Returns:
+            Dictionary mapping each cached key to its polarity scores
+        """
+        keys = list(keys)
+        found = {}
+        now = time.time_ns()
+        conn = self._connect()
+        try:
+            with conn:
+                for i in range(0, len(keys), self._QUERY_BATCH):
+                    batch = keys[i:i + self._QUERY_BATCH]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = conn.execute(
+                        f'SELECT key, neg, neu, pos, compound FROM scores WHERE key IN ({placeholders})', batch
+                    ).fetchall()
+                    for key, neg, neu, pos, compound in rows:
+                        found[key] = {'neg': neg, 'neu': neu, 'pos': pos, 'compound': compound}
+                    if rows:
+                        conn.execute(
+                            f'UPDATE scores SET last_used = ? WHERE key IN ({",".join("?" * len(rows))})',
+                            [now] + [row[0] for row in rows]
+                        )
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, scores: Dict[str, Dict]):
+        """
+        Store scores and evict the least recently used entries over the size bound.
+
+        Args:
+            scores: Dictionary mapping text hashes to polarity scores
+        """
+        if not scores:
+            return
+        now = time.time_ns()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO scores (key, neg, neu, pos, compound, last_used) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(key, s['neg'], s['neu'], s['pos'], s['compound'], now) for key, s in scores.items()]
+                )
+                excess = conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        'DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)',
+                        (excess,)
+                    )
+                    self.logger.debug(f"Evicted {excess} entries from sentiment cache")
+        finally:
+            conn.close()
+
+
+class SentimentScorer:
+    """Scores message texts with VADER, sharding work across a process pool"""
+
+    def __init__(self, workers: Optional[int] = 1, chunk_size: int = 2000,
+                 cache: Optional[SentimentCache] = None):
+        """
+        Initialize the sentiment scorer.
+
+        Args:
+            workers: Number of worker processes (None uses all CPUs, 1 scores in-process)
+            chunk_size: Number of texts sent to a worker per task
+            cache: Optional persistent cache consulted before scoring
+        """
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.cache = cache
+
+    def score(self, texts: Sequence[str]) -> List[Dict]:
+        """
+        Compute VADER polarity scores for each text.
+
+        Repeated texts are scored once, and texts found in the cache are not
+        scored at all.
+
+        Args:
+            texts: Message texts to score
+
+        Returns:
+            List of polarity score dicts in the same order as ``texts``
+        """
+        normalized = [normalize_text(text) for text in texts]
+        unique_texts = list(dict.fromkeys(normalized))
+        
+        known = {}
+        if self.cache is not None:
+            keys = {text: SentimentCache.key_for(text) for text in unique_texts}
+            try:
+                cached = self.cache.get_many(keys.values())
+                known = {text: cached[key] for text, key in keys.items() if key in cached}
+            except sqlite3.Error as e:
+                self.logger.warning(f"Could not read sentiment cache: {str(e)}")
+        
+        missing = [text for text in unique_texts if text not in known]
+        self.logger.info(f"Scoring sentiment for {len(missing)} of {len(normalized)} texts "
+                         f"({len(unique_texts)} unique, {len(known)} cached)")
+        new_scores = self._score_texts(missing)
+        known.update(zip(missing, new_scores))
+        
+        if self.cache is not None:
+            try:
+                self.cache.put_many({keys[text]: score for text, score in zip(missing, new_scores)})
+            except sqlite3.Error as e:
+                self.logger.warning(f"Could not update sentiment cache: {str(e)}")
+        
+        return [known[text] for text in normalized]
+
+    def _score_texts(self, texts: List[str]) -> List[Dict]:
+        """Score texts, in parallel when there is enough work"""
+        if self.workers <= 1 or len(texts) <= self.chunk_size:
+            return self._score_serial(texts)
+
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                # map() yields results in submission order, so shards come back aligned
+                scores = []
+                for chunk_scores in pool.map(_score_chunk, chunks):
+                    scores.extend(chunk_scores)
+                return scores
+        except Exception as e:
+            self.logger.warning(f"Parallel sentiment scoring failed, falling back to a single process: {str(e)}")
+            return self._score_serial(texts)
+
+    def _score_serial(self, texts: List[str]) -> List[Dict]:
+        """Score texts in the current process"""
+        sia = SentimentIntensityAnalyzer()
+        return [sia.polarity_scores(text) for text in texts]
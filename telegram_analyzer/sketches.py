@@ -0,0 +1,142 @@
+"""
+Bounded-memory frequency sketches for streaming counts.
+"""
+
+import heapq
+from typing import Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch.
+
+    Tracks at most ``capacity`` items. When a new item arrives while the
+    sketch is full, the item with the smallest count is evicted and the
+    newcomer inherits that count, which is recorded as its maximum
+    overestimation. Any item occurring more than N / capacity times in a
+    stream of N items is guaranteed to be tracked, and while fewer than
+    ``capacity`` distinct items have been seen all counts are exact.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        """
+        Initialize the sketch.
+
+        Args:
+            capacity: Maximum number of tracked items
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        # Lazy min-heap of (count, sequence, item); entries go stale as counts grow
+        self._heap = []
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._counts
+
+    def add(self, item: Hashable, count: int = 1):
+        """
+        Count one or more occurrences of an item.
+
+        Args:
+            item: Item to count
+            count: Number of occurrences
+        """
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0
+        else:
+            floor = self._pop_min()
+            self._counts[item] = floor + count
+            self._errors[item] = floor
+        self._push(item)
+
+    def update(self, items: Iterable[Hashable]):
+        """Count every item of an iterable once"""
+        for item in items:
+            self.add(item)
+
+    def _push(self, item: Hashable):
+        self._sequence += 1
+        heapq.heappush(self._heap, (self._counts[item], self._sequence, item))
+        # Stale entries accumulate with every increment; rebuild before the heap gets large
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, i, item) for i, (item, count) in enumerate(self._counts.items())]
+            heapq.heapify(self._heap)
+            self._sequence = len(self._heap)
+
+    def _pop_min(self) -> int:
+        """Evict the tracked item with the smallest count and return that count"""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self._counts.get(item) == count:
+                del self._counts[item]
+                del self._errors[item]
+                return count
+
+    def count(self, item: Hashable) -> int:
+        """Estimated count of an item (an upper bound; 0 if untracked)"""
+        return self._counts.get(item, 0)
+
+    def error(self, item: Hashable) -> int:
+        """Maximum overestimation of an item's count"""
+        return self._errors.get(item, 0)
+
+    def most_common(self, n: int = None) -> List[Tuple[Hashable, int]]:
+        """
+        Items with the highest estimated counts.
+
+        Args:
+            n: Number of items to return (all tracked items when None)
+
+        Returns:
+            List of (item, count) pairs, highest first; ties keep first-seen order
+        """
+        ranked = sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+
+def iter_ngrams(tokens: Sequence[str], order: int) -> Iterator[str]:
+    """
+    Yield the space-joined n-grams of a token sequence.
+
+    Args:
+        tokens: Tokens of one message
+        order: Number of tokens per n-gram
+
+    Yields:
+        N-gram strings
+    """
+    for i in range(len(tokens) - order + 1):
+        yield " ".join(tokens[i:i + order])
+
+
+def count_by_key(keyed_items: Iterable[Tuple[Hashable, Iterable[Hashable]]],
+                 capacity: int) -> Dict[Hashable, SpaceSaving]:
+    """
+    Feed items into one sketch per key.
+
+    Args:
+        keyed_items: Pairs of (key, items), e.g. (user, n-grams of one message)
+        capacity: Capacity of each sketch
+
+    Returns:
+        Dictionary mapping each key to its sketch, in order of first appearance
+    """
+    sketches = {}
+    for key, items in keyed_items:
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = SpaceSaving(capacity)
+        sketch.update(items)
+    return sketches
@@ -0,0 +1,225 @@
+"""
+Incremental reader for large Telegram export JSON files.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Key path of the message array in a single-chat export
+MESSAGES_PATH = ('messages',)
+
+# Key path of the chat array in a full-account export
+ACCOUNT_CHATS_PATH = ('chats', 'list')
+
+# Key path of the chat array written by the HTML converter's combined mode
+COMBINED_CHATS_PATH = ('chats',)
+
+
+class StreamingExportReader:
+    """
+    Walks a Telegram export one JSON value at a time.
+
+    Only the array selected by ``stream_path`` is streamed; every other
+    top-level field is decoded normally, which keeps memory bounded by the
+    size of a single message rather than by the size of the export.
+    """
+
+    def __init__(self, json_file: str, chunk_size: int = 1 << 20):
+        """
+        Initialize the streaming reader.
+
+        Args:
+            json_file: Path to the Telegram export JSON file
+            chunk_size: Number of characters read from disk at a time
+        """
+        self.logger = logging.getLogger(__name__)
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+
+    def read_header(self, stream_path: Sequence[str] = MESSAGES_PATH) -> Dict:
+        """
+        Read the top-level fields that precede the streamed array.
+
+        Args:
+            stream_path: Key path of the array to stream (e.g. ('chats', 'list'))
+
+        Returns:
+            Dictionary of top-level fields. The first key of ``stream_path`` is
+            present with a value of None when the array was found.
+        """
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            cursor = _Cursor(f, self.chunk_size)
+            header = {}
+            if cursor.seek_path([stream_path], header):
+                header[stream_path[0]] = None
+            return header
+
+    def locate(self, stream_paths: Sequence[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+        """
+        Find which of several candidate arrays the export contains.
+
+        Only the fields preceding the array are decoded, so this is cheap
+        even for very large exports.
+
+        Args:
+            stream_paths: Candidate key paths, e.g. (MESSAGES_PATH, ACCOUNT_CHATS_PATH)
+
+        Returns:
+            The first key path that leads to an array, or None if none does
+        """
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            path = _Cursor(f, self.chunk_size).seek_path(stream_paths, None)
+            return tuple(path) if path else None
+
+    def iter_items(self, stream_path: Sequence[str] = MESSAGES_PATH) -> Iterator[Any]:
+        """
+        Yield the elements of the streamed array one at a time.
+
+        Args:
+            stream_path: Key path of the array to stream
+
+        Yields:
+            Decoded array elements in file order
+        """
+        with open(self.json_file, 'r', encoding='utf-8') as f:
+            cursor = _Cursor(f, self.chunk_size)
+            if not cursor.seek_path([stream_path], None):
+                raise ValueError(f"Invalid JSON structure: missing '{'.'.join(stream_path)}' array")
+            yield from cursor.iter_array()
+
+    def iter_batches(self, batch_size: int,
+                     stream_path: Sequence[str] = MESSAGES_PATH) -> Iterator[List[Any]]:
+        """
+        Yield the elements of the streamed array in lists of ``batch_size``.
+
+        Args:
+            batch_size: Maximum number of elements per batch
+            stream_path: Key path of the array to stream
+
+        Yields:
+            Lists of decoded array elements
+        """
+        batch = []
+        for item in self.iter_items(stream_path):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class _Cursor:
+    """Buffered position in a JSON text stream"""
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Append the next chunk to the buffer, dropping consumed text"""
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def _expect(self, char: str):
+        """Consume the next non-whitespace character, which must be ``char``"""
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' but found '{found}'")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self._peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number or literal touching the end of the buffer may be truncated
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads geometrically so very large values are not re-decoded too often
+            self._fill(read_size)
+            read_size *= 2
+
+    def seek_path(self, paths: Sequence[Sequence[str]], header: Optional[Dict]) -> Optional[Sequence[str]]:
+        """
+        Advance into the first array found at one of ``paths``, collecting skipped top-level fields.
+
+        A one-key path only matches an array value and a longer path only
+        descends into an object value, so ('chats',) and ('chats', 'list')
+        can be told apart.
+
+        Returns:
+            The matched path, with the cursor positioned just inside the array,
+            or None when no path leads to an array
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return None
+        while True:
+            key = self.decode_value()
+            self._expect(':')
+            value_start = self._peek()
+            if value_start == '[' and any(len(path) == 1 and path[0] == key for path in paths):
+                self.pos += 1
+                return (key,)
+            nested = [path[1:] for path in paths if len(path) > 1 and path[0] == key]
+            if nested and value_start == '{':
+                found = self.seek_path(nested, None)
+                if found:
+                    return (key,) + tuple(found)
+                value = None
+            else:
+                value = self.decode_value()
+            if header is not None:
+                header[key] = value
+            separator = self._peek()
+            self.pos += 1
+            if separator == '}':
+                return None
+            if separator != ',':
+                raise ValueError(f"Invalid JSON: unexpected '{separator}' in object")
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the remaining elements of the array the cursor is inside"""
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Invalid JSON: unexpected '{separator}' in array")
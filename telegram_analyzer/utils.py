@@ -8,6 +8,67 @@ import re
 import emoji
 from typing import Dict, List, Tuple, Any, Optional
 
+def _char_class(chars) -> str:
+    """Render characters as a regex class of merged code point ranges"""
+    ranges = []
+    for code in sorted(ord(char) for char in chars):
+        if ranges and code == ranges[-1][1] + 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return '[' + ''.join(
+        re.escape(chr(low)) if low == high else f'{re.escape(chr(low))}-{re.escape(chr(high))}'
+        for low, high in ranges
+    ) + ']'
+
+def _trie_pattern(node: Dict) -> str:
+    """Render a character trie as a regex that prefers the longest sequence"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 and '' not in node else '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if '' in node else pattern
+
+def _bucketed_pattern(trie: Dict, chars: List[str], shifts: Tuple[int, ...]) -> str:
+    """
+    Group the trie's first characters into code point blocks behind range lookaheads.
+    
+    The regex engine tries alternatives one by one and cannot build a fast
+    first-character table for non-BMP characters, so a flat alternation of
+    ~1400 emoji would be scanned in full at every candidate position.
+    """
+    if not shifts:
+        return '|'.join(re.escape(char) + _trie_pattern(trie[char]) for char in sorted(chars))
+    blocks = {}
+    for char in chars:
+        blocks.setdefault(ord(char) >> shifts[0], []).append(char)
+    if len(blocks) == 1:
+        return _bucketed_pattern(trie, chars, shifts[1:])
+    return '|'.join(
+        f'(?={_char_class(block)})(?:{_bucketed_pattern(trie, block, shifts[1:])})'
+        for _, block in sorted(blocks.items())
+    )
+
+def _build_emoji_pattern() -> re.Pattern:
+    """Compile every known emoji sequence (ZWJ, skin tones, flags, keycaps) into one regex"""
+    trie = {}
+    for sequence in emoji.EMOJI_DATA:
+        node = trie
+        for char in sequence:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    # Reject ordinary ASCII up front, then any character that cannot start an emoji
+    return re.compile(
+        r'(?![\x00-"$-)+-/:-\x7f])'
+        f'(?={_char_class(trie)})'
+        f'(?:{_bucketed_pattern(trie, list(trie), (10, 6, 3))})'
+    )
+
+# Matches whole emoji sequences in a single pass over a text
+EMOJI_PATTERN = _build_emoji_pattern()
+
+LINK_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
 # Set up logging
 def setup_logging(level=logging.INFO):
     """Configure logging for the application"""
@@ -41,8 +102,12 @@ def extract_text_from_message(msg: Dict) -> str:
 
 def has_emoji(text: str) -> bool:
     """Check if text contains emoji"""
-    return bool(any(char in emoji.EMOJI_DATA for char in text))
+    return bool(EMOJI_PATTERN.search(text))
+
+def extract_emojis(text: str) -> List[str]:
+    """Extract emoji sequences from text in order of appearance"""
+    return EMOJI_PATTERN.findall(text)
 
 def has_link(text: str) -> bool:
     """Check if text contains a URL"""
-    return bool(re.search(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text))
+    return bool(LINK_PATTERN.search(text))
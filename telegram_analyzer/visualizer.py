@@ -16,19 +16,38 @@ from nltk.tokenize import word_tokenize
 from collections import Counter
 import networkx as nx
 import logging
-import emoji
 from datetime import timedelta
+from .utils import EMOJI_PATTERN
+from .activity_cube import ActivityCube
+from .reply_graph import ReplyGraph
 import matplotlib.colors as mcolors
 
 class Visualizer:
     """Generates visualizations from analyzed data"""
     
-    def __init__(self, df: pd.DataFrame, output_dir: str):
+    def __init__(self, df: pd.DataFrame, output_dir: str, activity_cube: ActivityCube = None,
+                 reply_graph: ReplyGraph = None):
         self.df = df
         self.output_dir = output_dir
         self.logger = logging.getLogger(__name__)
+        self._activity_cube = activity_cube
+        self._reply_graph = reply_graph
         os.makedirs(output_dir, exist_ok=True)
 
+    @property
+    def activity_cube(self) -> ActivityCube:
+        """Activity count cube of the messages, built on first use unless one was passed in"""
+        if self._activity_cube is None:
+            self._activity_cube = ActivityCube.from_frame(self.df)
+        return self._activity_cube
+
+    @property
+    def reply_graph(self) -> ReplyGraph:
+        """Reply graph of the messages, built on first use unless one was passed in"""
+        if self._reply_graph is None:
+            self._reply_graph = ReplyGraph(self.df)
+        return self._reply_graph
+
     def generate_all_visualizations(self):
         """Generate all available visualizations"""
         successful_viz = []
@@ -113,10 +132,7 @@ class Visualizer:
     def generate_activity_heatmap(self):
         """Generate activity heatmap"""
         self.logger.info("Generating activity heatmap")
-        activity_pivot = pd.crosstab(
-            self.df['date'].dt.day_name(),
-            self.df['date'].dt.hour
-        )
+        activity_pivot = self.activity_cube.weekday_hour()
         
         plt.figure(figsize=(12, 6))
         sns.heatmap(activity_pivot, cmap='YlOrRd', cbar_kws={'label': 'Message Count'})
@@ -190,8 +206,7 @@ class Visualizer:
         self.logger.info("Generating weekly activity chart")
         
         # Count messages by day of week
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        day_counts = self.df['date'].dt.day_name().value_counts().reindex(days_order)
+        day_counts = self.activity_cube.weekday_totals()
         
         plt.figure(figsize=(12, 6))
         ax = sns.barplot(x=list(day_counts.index), y=list(day_counts.values), hue=list(day_counts.index), palette='viridis', legend=False)
@@ -277,18 +292,18 @@ class Visualizer:
         """Generate chart of most commonly used emojis"""
         self.logger.info("Generating emoji usage chart")
         
-        # Combine all messages
-        all_text = ' '.join(self.df['text'].dropna().astype(str))
-        
-        # Extract emojis from text
-        emoji_list = [c for c in all_text if c in emoji.EMOJI_DATA]
+        # Reuse the emoji sequences extracted by the parser when available
+        if 'emojis' in self.df.columns:
+            emoji_list = self.df['emojis'].dropna().explode().dropna()
+        else:
+            emoji_list = self.df['text'].dropna().astype(str).str.findall(EMOJI_PATTERN).explode().dropna()
         
-        if not emoji_list:
+        if emoji_list.empty:
             self.logger.warning("No emojis found in data, skipping emoji usage chart")
             return
             
         # Count emoji frequencies
-        emoji_counts = Counter(emoji_list).most_common(15)
+        emoji_counts = list(emoji_list.value_counts().head(15).items())
         
         # Create a dataframe for easier plotting
         emoji_df = pd.DataFrame(emoji_counts, columns=['emoji', 'count'])
@@ -318,7 +333,7 @@ class Visualizer:
         filtered_df = self.df[self.df['from'].isin(top_users)]
         
         # Group by user and date (daily)
-        user_daily = filtered_df.groupby([filtered_df['date'].dt.date, 'from']).size().unstack().fillna(0)
+        user_daily = filtered_df.groupby([filtered_df['date'].dt.date, 'from'], observed=True).size().unstack().fillna(0)
         
         # Plot time series
         plt.figure(figsize=(14, 8))
@@ -448,15 +463,8 @@ class Visualizer:
         """Generate visualization of conversation flow throughout the day"""
         self.logger.info("Generating conversation flow visualization")
         
-        # Group messages by hour and day of week
-        hourly_flow = self.df.groupby([self.df['date'].dt.hour, self.df['date'].dt.day_name()]).size().unstack()
-        
-        # Reorder days
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        hourly_flow = hourly_flow.reindex(columns=days_order)
-        
-        # Fill NaN with 0
-        hourly_flow = hourly_flow.fillna(0)
+        # Hours as rows, days of week (Monday first) as columns
+        hourly_flow = self.activity_cube.weekday_hour().T
         
         plt.figure(figsize=(14, 8))
         
@@ -493,7 +501,7 @@ class Visualizer:
             if not pd.api.types.is_datetime64_any_dtype(filtered_df['date']):
                 filtered_df['date'] = pd.to_datetime(filtered_df['date'])
                 
-            user_daily = filtered_df.groupby([filtered_df['date'].dt.date, 'from']).size().unstack().fillna(0)
+            user_daily = filtered_df.groupby([filtered_df['date'].dt.date, 'from'], observed=True).size().unstack().fillna(0)
             
             if user_daily.empty:
                 self.logger.warning("No data for user message timeline, skipping visualization")
@@ -598,15 +606,8 @@ class Visualizer:
             if not pd.api.types.is_datetime64_any_dtype(self.df['date']):
                 self.df['date'] = pd.to_datetime(self.df['date'])
                 
-            # Group messages by hour and day of week
-            hourly_flow = self.df.groupby([self.df['date'].dt.hour, self.df['date'].dt.day_name()]).size().unstack()
-            
-            # Reorder days
-            days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            hourly_flow = hourly_flow.reindex(columns=days_order)
-            
-            # Fill NaN with 0
-            hourly_flow = hourly_flow.fillna(0)
+            # Hours as rows, days of week (Monday first) as columns
+            hourly_flow = self.activity_cube.weekday_hour().T
             
             plt.figure(figsize=(14, 8))
             
@@ -639,7 +640,8 @@ class Visualizer:
     def generate_chat_velocity_chart(self):
         """Generate message velocity chart over time"""
         self.logger.info("Generating chat velocity chart")
-        daily_velocity = self.df.groupby(self.df['date'].dt.date).size()
+        daily_velocity = self.activity_cube.daily()
+        daily_velocity = daily_velocity[daily_velocity > 0]
         rolling_7 = daily_velocity.rolling(window=7, min_periods=1).mean()
         
         plt.figure(figsize=(14, 7))
@@ -746,19 +748,15 @@ class Visualizer:
         try:
             import networkx as nx
             
-            # Create interaction edges (simplified: sequence of messages)
-            edges = []
-            users = self.df['from'].dropna().tolist()
-            for i in range(len(users) - 1):
-                if users[i] != users[i+1]:
-                    edges.append(tuple(sorted((users[i], users[i+1]))))
-            
-            edge_counts = Counter(edges)
+            # Explicit replies, or the previous message for messages that are not replies
+            answers = self.reply_graph.interactions()
+            pairs = np.sort(answers[['responder', 'target']].to_numpy(dtype=str), axis=1)
+            edge_counts = pd.DataFrame(pairs).value_counts()
             
             G = nx.Graph()
             for (u1, u2), weight in edge_counts.items():
                 if weight > 1: # Only significant interactions
-                    G.add_edge(u1, u2, weight=weight)
+                    G.add_edge(u1, u2, weight=int(weight))
             
             if len(G.nodes) == 0:
                 self.logger.warning("Not enough interactions for network graph")
@@ -15,6 +15,7 @@ import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
 from functools import wraps
+from telegram_analyzer.activity_cube import ActivityCube, ACTIVITY_CUBE_FILE
 
 # Check if Flask is available
 try:
@@ -71,6 +72,7 @@ class AnalyzerWebServer:
         
         self.app = self._create_app()
         self.analysis_status = {}  # Thread-safe storage for analysis progress
+        self._activity_cube = None  # (modification time, cube) of the loaded activity cube
         
     def _create_app(self):
         """Create Flask application"""
@@ -429,6 +431,30 @@ class AnalyzerWebServer:
             else:
                 return jsonify({"error": "Statistics not found"})
         
+        @app.route('/api/activity')
+        @login_required
+        def get_activity():
+            """API endpoint counting messages over a date range, e.g. ?start=2024-01-01&end=2024-02-01&user=Alice"""
+            cube = self._load_activity_cube()
+            if cube is None:
+                return jsonify({"error": "Activity data not found"})
+            
+            start = request.args.get('start') or None
+            end = request.args.get('end') or None
+            users = request.args.getlist('user') or None
+            try:
+                hourly = cube.hourly(start, end, users)
+                weekdays = cube.weekday_totals(start, end, users)
+            except (KeyError, ValueError) as e:
+                return jsonify({"error": str(e)}), 400
+            
+            return jsonify({
+                "total": int(hourly.sum()),
+                "hourly": [int(count) for count in hourly],
+                "weekdays": {day: int(count) for day, count in weekdays.items()},
+                "users": {user: int(count) for user, count in cube.user_totals(start, end).items()}
+            })
+        
         @app.route('/api/visualizations')
         @login_required
         def get_visualizations():
@@ -597,6 +623,8 @@ class AnalyzerWebServer:
             
             # Import analysis modules here to avoid circular imports
             from telegram_analyzer.parser import TelegramDataParser
+            from telegram_analyzer.batch import BatchIngestor
+            from telegram_analyzer.streaming import MESSAGES_PATH
             from telegram_analyzer.analyzer import ChatAnalyzer
             from telegram_analyzer.visualizer import Visualizer
             from telegram_analyzer.report import ReportGenerator
@@ -609,8 +637,14 @@ class AnalyzerWebServer:
             
             # Process messages
             self.logger.info("Processing messages...")
-            data_parser = TelegramDataParser(file_path)
-            messages_df = data_parser.process_messages()
+            cache_dir = os.path.join(self.output_dir, '.cache')
+            ingestor = BatchIngestor(workers=1, cache_dir=cache_dir)
+            if ingestor.detect_layout(file_path) == MESSAGES_PATH:
+                data_parser = TelegramDataParser(file_path, cache_dir=cache_dir)
+                messages_df = data_parser.process_messages()
+            else:
+                # Account or combined export holding several chats
+                messages_df = ingestor.process([file_path])
             self.logger.info(f"Processed {len(messages_df)} messages")
             
             # Update progress
@@ -630,7 +664,7 @@ class AnalyzerWebServer:
             os.makedirs(online_presence_dir, exist_ok=True)
             
             try:
-                online_analyzer = OnlinePresenceAnalyzer(messages_df, online_presence_dir)
+                online_analyzer = OnlinePresenceAnalyzer(messages_df, online_presence_dir, analyzer=analyzer)
                 online_analyzer.generate_online_presence_report()
                 online_presence_stats = online_analyzer.get_online_time_stats()
                 analysis_results['online_presence'] = online_presence_stats
@@ -644,10 +678,13 @@ class AnalyzerWebServer:
             
             # Export statistics to JSON for web server
             export_stats_to_json(analysis_results, self.output_dir)
+            activity_cube = analyzer.features.activity_cube
+            activity_cube.save(os.path.join(self.output_dir, ACTIVITY_CUBE_FILE))
 
             # Generate standard visualizations
             self.logger.info("Generating visualizations...")
-            visualizer = Visualizer(messages_df, self.output_dir)
+            visualizer = Visualizer(messages_df, self.output_dir, activity_cube=activity_cube,
+                                    reply_graph=analyzer.get_reply_graph())
             generated_viz = visualizer.generate_all_visualizations()
             self.logger.info(f"Generated {len(generated_viz)} static visualizations")
             
@@ -723,6 +760,17 @@ class AnalyzerWebServer:
         self.app.run(host=self.host, port=self.port, debug=False)
         return True
         
+    def _load_activity_cube(self):
+        """Load the saved activity cube, reusing it until the file changes"""
+        cube_path = os.path.join(self.output_dir, ACTIVITY_CUBE_FILE)
+        if not os.path.exists(cube_path):
+            return None
+        
+        mtime = os.path.getmtime(cube_path)
+        if self._activity_cube is None or self._activity_cube[0] != mtime:
+            self._activity_cube = (mtime, ActivityCube.load(cube_path))
+        return self._activity_cube[1]
+        
     def _open_browser_delayed(self):
         """Open browser after a short delay to allow server to start"""
         time.sleep(1.5)  # Wait for server to start
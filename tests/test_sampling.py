@@ -0,0 +1,45 @@
+"""
+Tests for the stratified sample estimators.
+"""
+
+import numpy as np
+from telegram_analyzer.sampling import StratifiedSample
+
+
+def _strata_with_missing_values():
+    """Four strata, one of them mostly NaN with much larger values than the others"""
+    rng = np.random.default_rng(1)
+    strata = np.repeat(np.arange(4), [2000, 1000, 500, 300])
+    values = rng.normal(30, 5, len(strata))
+    sparse = strata == 1
+    values[sparse] = np.where(rng.random(sparse.sum()) < 0.9, np.nan, 300.0)
+    return strata, values
+
+
+def test_full_sample_is_exact_with_missing_values():
+    strata, values = _strata_with_missing_values()
+    sample = StratifiedSample(strata, 1.0)
+    mean = sample.mean(values[sample.positions])
+    total = sample.total(values[sample.positions])
+    assert np.isclose(mean['estimate'], np.nanmean(values))
+    assert np.isclose(mean['low'], mean['high'])
+    assert np.isclose(total['estimate'], np.nansum(values))
+
+
+def test_mean_intervals_cover_with_missing_values():
+    strata, values = _strata_with_missing_values()
+    exact = np.nanmean(values)
+    covered = 0
+    for seed in range(100):
+        sample = StratifiedSample(strata, 0.1, random_state=seed)
+        interval = sample.mean(values[sample.positions])
+        covered += interval['low'] <= exact <= interval['high']
+    assert covered >= 85
+
+
+def test_domain_means_with_missing_values():
+    strata, values = _strata_with_missing_values()
+    sample = StratifiedSample(strata, 1.0)
+    means = sample.mean(values[sample.positions], domains=['a', 'b', 'a', 'c'])
+    assert np.isclose(means['a']['estimate'], np.nanmean(values[(strata == 0) | (strata == 2)]))
+    assert np.isclose(means['b']['estimate'], 300.0)